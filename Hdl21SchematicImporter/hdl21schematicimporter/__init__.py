@@ -4,3 +4,14 @@ from .pyimporter import *
 from .svg import *
 from .circuit import *
 from .code import *
+
+
+def __getattr__(name: str):
+    """Module-level (PEP 562) attribute hook, importing `hdl21` on first access.
+    `hdl21` is no longer imported along with this package, but remains available as its `hdl21` attribute."""
+    if name == "hdl21":
+        import hdl21
+
+        globals()["hdl21"] = hdl21
+        return hdl21
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,10 +7,22 @@ Circuit data is often parsed from JSON-encoded text embedded in an SVG schematic
 Thus it is crucial that the data model here matches that of the editor tool.
 """
 
-from typing import List
+import sys
+from functools import lru_cache, cached_property
+from typing import List, Dict
 from enum import Enum
+from pydantic import VERSION as PYDANTIC_VERSION
 from pydantic.dataclasses import dataclass
 
+# Circuit data is immutable once parsed; all of its types are frozen.
+# The many small `Signal`s, `Connection`s and `Instance`s are also slotted, dropping their per-instance `__dict__`,
+# where supported: on Python 3.10+, with pydantic v2.
+_SLOTS = (
+    {"slots": True}
+    if sys.version_info >= (3, 10) and not PYDANTIC_VERSION.startswith("1.")
+    else {}
+)
+
 
 class PortDir(Enum):
     """# Signal/ Port Direction
@@ -22,7 +34,7 @@ class PortDir(Enum):
     INOUT = "INOUT"
 
 
-@dataclass
+@dataclass(frozen=True, **_SLOTS)
 class Signal:
     """# Circuit Signal"""
 
@@ -30,7 +42,7 @@ class Signal:
     portdir: PortDir
 
 
-@dataclass
+@dataclass(frozen=True, **_SLOTS)
 class Connection:
     """# Instance Connection
     A (port, signal) pair, specified in string names."""
@@ -39,7 +51,15 @@ class Connection:
     signame: str
 
 
-@dataclass
+@lru_cache(maxsize=4096)
+def make_connection(portname: str, signame: str) -> Connection:
+    """Get a `Connection` between `portname` and `signame`, shared with any others between the same pair.
+    Schematics repeat the same few (port, signal) pairs across many instances, e.g. the `d, g, s, b` of each transistor.
+    `Connection`s are immutable, so sharing them is safe."""
+    return Connection(portname=sys.intern(portname), signame=sys.intern(signame))
+
+
+@dataclass(frozen=True, **_SLOTS)
 class Instance:
     """# Circuit Instance"""
 
@@ -48,7 +68,7 @@ class Instance:
     conns: List[Connection]  # Connections
 
 
-@dataclass
+@dataclass(frozen=True)
 class Circuit:
     """# Circuit
     The circuit-level content of a Schematic. This might alternatively be called a "Module". 
@@ -58,3 +78,13 @@ class Circuit:
     prelude: str  # Code Prelude
     signals: List[Signal]  # Signals
     instances: List[Instance]  # Instances
+
+    @cached_property
+    def signals_by_name(self) -> Dict[str, Signal]:
+        """Signals, indexed by name. Computed on first access."""
+        return {signal.name: signal for signal in self.signals}
+
+    @cached_property
+    def instances_by_name(self) -> Dict[str, Instance]:
+        """Instances, indexed by name. Computed on first access."""
+        return {instance.name: instance for instance in self.instances}
@@ -4,14 +4,13 @@
 Translate circuits/ modules to executable Python code. 
 """
 
-from copy import copy
+import os
+import hashlib
+from functools import lru_cache
 from pathlib import Path
 from dataclasses import dataclass
-from types import SimpleNamespace
-from typing import Type, Optional
-
-# "Friendly" imports
-import hdl21
+from types import SimpleNamespace, CodeType
+from typing import Type, Optional, List, Dict, Tuple, Any
 
 # Local imports
 from .circuit import Circuit, PortDir
@@ -32,6 +31,21 @@ Params = h.HasNoParams
 """
 
 
+@lru_cache(maxsize=256)
+def _compile_prelude(prelude: str) -> CodeType:
+    """Compile a code-prelude, once per distinct prelude.
+    Schematics commonly share a prelude, most of all the `DEFAULT_PRELUDE`."""
+    return compile(prelude, "<schematic prelude>", "exec")
+
+
+# Port constructor code, by port direction
+PORT_CONSTRUCTORS = {
+    PortDir.INPUT: "h.Input",
+    PortDir.OUTPUT: "h.Output",
+    PortDir.INOUT: "h.Inout",
+}
+
+
 @dataclass
 class GeneratorSpec:
     """Interim "spec" for the Hdl21 Generator ultimately produced."""
@@ -46,19 +60,24 @@ class CodeWriter:
 
     def __init__(self, circuit: Circuit):
         self.circuit: Circuit = circuit  # The input Circuit
-        self.code: str = ""  # The result code string
+        # The result code, as a list of strings, joined once complete
+        self.lines: List[str] = []
         self.indent: int = 0  # Current indentation level, in "tabs"
         self.tab: str = "    "  # Per-tab indentation string
 
     def specs(self) -> GeneratorSpec:
         """Get the attributes we care about from the schematic prelude, by ... aahhhh ... `exec()`ing it."""
 
+        # `hdl21` is imported here, on first use, rather than at module level.
+        # It is by far the largest part of this package's import time.
+        import hdl21
+
         # Set the "pre-prelude": "import hdl21 as h"
         scope = dict(h=hdl21)
 
         # It's really this simple: execute the prelude, and examine a few fields that it can define.
-        prelude = self.circuit.prelude.strip() or copy(DEFAULT_PRELUDE)
-        exec(prelude, scope)
+        prelude = self.circuit.prelude.strip() or DEFAULT_PRELUDE
+        exec(_compile_prelude(prelude), scope)
 
         # After executing the prelude, check that `h` still refers to the hdl21 module, or fail
         h = scope.get("h", None)
@@ -90,7 +109,7 @@ class CodeWriter:
         spec = self.specs()
 
         # Write the prelude
-        self.code += copy(spec.prelude) + "\n\n"
+        self.lines.append(spec.prelude + "\n\n")
 
         # If no `Params` type is defined, alias it to `HasNoParams`
         if spec.paramtype is None:
@@ -105,26 +124,26 @@ class CodeWriter:
         self.writeln(f"m = h.Module()")
         self.writeln("")
 
+        # Split the Signals into ports and internal Signals, in a single pass.
+        # Each keeps its original order; in particular ports are *not* grouped by direction, as port order matters.
+        ports, internal_signals = [], []
+        for signal in self.circuit.signals:
+            if signal.portdir is PortDir.INTERNAL:
+                internal_signals.append(signal)
+            else:
+                ports.append(signal)
+
         # Declare Ports
-        ports = [s for s in self.circuit.signals if s.portdir != PortDir.INTERNAL]
-        port_constructors = {
-            PortDir.INPUT: "h.Input",
-            PortDir.OUTPUT: "h.Output",
-            PortDir.INOUT: "h.Inout",
-        }
         for port in ports:
-            constructor = port_constructors.get(port.portdir, None)
+            constructor = PORT_CONSTRUCTORS.get(port.portdir, None)
             if constructor is None:
-                self.fail("Invalid port direction for {port}")
+                self.fail(f"Invalid port direction for {port}")
 
             self.writeln(f"m.{port.name} = {constructor}()")
 
         self.writeln("")
 
         # Declare internal Signals
-        internal_signals = [
-            s for s in self.circuit.signals if s.portdir == PortDir.INTERNAL
-        ]
         for signal in internal_signals:
             self.writeln(f"m.{signal.name} = h.Signal()")
 
@@ -133,7 +152,7 @@ class CodeWriter:
         # Write Instances
         for instance in self.circuit.instances:
             conns = ", ".join(
-                [f"{conn.portname}=m.{conn.signame}" for conn in instance.conns]
+                f"{conn.portname}=m.{conn.signame}" for conn in instance.conns
             )
             self.writeln(f"m.{instance.name} = {instance.of}({conns})")
 
@@ -142,11 +161,11 @@ class CodeWriter:
         self.writeln(f"return m")
 
         self.indent -= 1
-        return self.code
+        return "".join(self.lines)
 
     def writeln(self, line: str):
         """Write a line with indentation"""
-        self.code += self.tab * self.indent + line + "\n"
+        self.lines.append(self.tab * self.indent + line + "\n")
 
     def fail(self, msg: str):
         raise ValueError(msg)
@@ -157,6 +176,17 @@ def circuit_to_code(circuit: Circuit) -> str:
     return CodeWriter(circuit).to_code()
 
 
+@lru_cache(maxsize=256)
+def _compile_schematic(code: str, name: str) -> CodeType:
+    """Compile a schematic's generated code, once per distinct code.
+    Shared by schematics whose generated code is identical, e.g. when edited and then reverted."""
+    return compile(code, f"<schematic:{name}>", "exec")
+
+
+# Cached `import_schematic` results, by absolute path: (digest of the SVG content, executed scope)
+_SCHEMATIC_CACHE: Dict[str, Tuple[bytes, Dict[str, Any]]] = {}
+
+
 def import_schematic(path: Path) -> SimpleNamespace:
     """
     # SVG to Hdl21 Namespace
@@ -167,14 +197,41 @@ def import_schematic(path: Path) -> SimpleNamespace:
     * The HDL21 Generator representing the schematic content
     * Its parameter type `Params`
     * All other attributes defined in the schematic's prelude
+
+    Results are cached until the SVG file's content changes: repeat imports share the same Generator and `Params`,
+    each in a new `SimpleNamespace`. `import_schematic.cache_clear()` empties the caches.
     """
 
+    # Check for a cached import of the same content.
+    # Content is compared, rather than modification times, which are too coarse on some filesystems
+    # to tell apart saves in quick succession, e.g. from the editor's autosave.
+    path = os.path.abspath(path)
+    with open(path, "rb") as f:
+        digest = hashlib.blake2b(f.read(), digest_size=16).digest()
+
+    cached = _SCHEMATIC_CACHE.get(path)
+    if cached is not None and cached[0] == digest:
+        return SimpleNamespace(**cached[1])
+
     # Load the circuit from SVG
     circuit = svg_to_circuit(path)
     # Convert it to Python code
     code = circuit_to_code(circuit)
 
+    # Compile the code, or re-use an earlier compilation of the same code
+    code_obj = _compile_schematic(code, circuit.name)
+
     # Execute the code, and return the resulting namespace
     scope = dict()
-    exec(code, scope)
+    exec(code_obj, scope)
+    _SCHEMATIC_CACHE[path] = (digest, scope)
     return SimpleNamespace(**scope)
+
+
+def _clear_import_caches() -> None:
+    """Clear all cached `import_schematic` results and compiled code"""
+    _SCHEMATIC_CACHE.clear()
+    _compile_schematic.cache_clear()
+
+
+import_schematic.cache_clear = _clear_import_caches
@@ -5,25 +5,56 @@ Discovers and introspects HDL21 PDKs installed in the Python environment.
 Provides device information including parameters and ports for the schematic editor.
 
 Communication is via JSON-RPC over stdin/stdout.
+
+Modules only needed for discovery, such as `concurrent.futures`, are imported
+where they are used, keeping start-up quick for the first command.
 """
 
+import re
 import sys
 import json
-import inspect
-import importlib
+import functools
+import threading
+from types import GeneratorType
 from dataclasses import dataclass, asdict, field
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple, Iterator, Union, Callable
 from enum import Enum
 
+try:  # Use `orjson` for the stdin/stdout loop where available, else the standard library
+    import orjson
+
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+
+
+# Port direction reported for all PDK device ports
+_INOUT = "inout"
 
-@dataclass
+
+def _intern(value):
+    """Intern a string, so that the many repeated port/param names and types in a PDK share one object.
+    (String literals in this module are already interned by the compiler.)"""
+    return sys.intern(value) if type(value) is str else value
+
+
+# Use `__slots__` for the (numerous) discovery records, where supported (Python 3.10+)
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(frozen=True, **_SLOTS)
 class PortInfo:
     """Port information for a PDK device"""
     name: str
-    direction: str = "inout"  # "input", "output", "inout"
+    direction: str = _INOUT  # "input", "output", "inout"
 
 
-@dataclass
+@dataclass(frozen=True, **_SLOTS)
 class ParamInfo:
     """Parameter information for a PDK device"""
     name: str
@@ -32,7 +63,7 @@ class ParamInfo:
     description: str = ""
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class DeviceInfo:
     """Complete device information"""
     name: str
@@ -43,7 +74,7 @@ class DeviceInfo:
     symbol_type: str = "Nmos"  # Maps to existing Element types
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class PdkInfo:
     """PDK package information"""
     name: str
@@ -64,6 +95,23 @@ KNOWN_PDKS: Dict[str, str] = {
 # Local PDK paths to search (set by add_local_path command)
 LOCAL_PDK_PATHS: List[str] = []
 
+# Cached result of `discover_all_pdks`, and the search configuration it was produced from.
+# Cleared by `invalidate_discovery_cache`, e.g. via the `refresh` command.
+_DISCOVERY_CACHE: Optional[List[PdkInfo]] = None
+_DISCOVERY_CACHE_KEY: Optional[tuple] = None
+
+# Index of the cached devices by (pdk name, device name), rebuilt alongside `_DISCOVERY_CACHE`
+_DEVICE_INDEX: Dict[Tuple[str, str], DeviceInfo] = {}
+
+# Serialized (`asdict`) form of `_DISCOVERY_CACHE`, built on first use by `discover_all_pdk_dicts`
+_DISCOVERY_DICTS: Optional[List[Dict[str, Any]]] = None
+
+# Count of `invalidate_discovery_cache` calls. Discovery captures it before starting, and only caches
+# its results if it is unchanged, so a discovery which overlaps an invalidation (e.g. from a background
+# install) does not cache its stale results. `_DISCOVERY_LOCK` makes the check-and-store atomic.
+_DISCOVERY_GENERATION = 0
+_DISCOVERY_LOCK = threading.Lock()
+
 # Mapping from device name patterns to symbol types
 # Order matters - more specific patterns should come first
 SYMBOL_PATTERNS: List[tuple] = [
@@ -101,28 +149,99 @@ CATEGORY_PATTERNS: List[tuple] = [
 ]
 
 
+def _compile_patterns(table: List[tuple]) -> "re.Pattern":
+    """Compile a (patterns, label) table into a single regex.
+
+    Each table entry becomes a lookahead alternative, anchored at the start of the name
+    and tried in table order, so the *earliest matching entry* wins regardless of where
+    in the name its substring occurs - just like scanning the table in order.
+    The index of the matching entry is encoded in the name of its group, `g<index>`."""
+    alternatives = (
+        f"(?=.*?(?P<g{index}>{'|'.join(map(re.escape, patterns))}))"
+        for index, (patterns, _) in enumerate(table)
+    )
+    return re.compile("|".join(alternatives), re.DOTALL)
+
+
+_SYMBOL_RE = _compile_patterns(SYMBOL_PATTERNS)
+_CATEGORY_RE = _compile_patterns(CATEGORY_PATTERNS)
+
+# Default port names for devices which do not declare their ports, by device-name pattern.
+# Order matters - the first matching entry is used.
+DEFAULT_PORT_PATTERNS: List[tuple] = [
+    (["nmos", "pmos", "nch", "pch", "nfet", "pfet", "fet"], ("d", "g", "s", "b")),
+    (["res", "cap", "ind"], ("p", "n")),
+    (["diode"], ("p", "n")),
+    (["npn", "pnp", "bjt"], ("c", "b", "e")),
+]
+_DEFAULT_PORTS_RE = _compile_patterns(DEFAULT_PORT_PATTERNS)
+
+
+@functools.lru_cache(maxsize=4096)
+def _match_symbol(name_lower: str) -> Optional[str]:
+    """Get the first `SYMBOL_PATTERNS` symbol matching a lower-cased device name, if any.
+    Cached, as device names recur across PDKs and across discovery runs."""
+    match = _SYMBOL_RE.match(name_lower)
+    if match is None:
+        return None
+    return SYMBOL_PATTERNS[int(match.lastgroup[1:])][1]
+
+
+@functools.lru_cache(maxsize=4096)
+def _match_category(name_lower: str) -> Optional[str]:
+    """Get the first `CATEGORY_PATTERNS` category matching a lower-cased device name, if any"""
+    match = _CATEGORY_RE.match(name_lower)
+    if match is None:
+        return None
+    return CATEGORY_PATTERNS[int(match.lastgroup[1:])][1]
+
+
 def get_symbol_type(name: str, num_ports: int = 0) -> str:
     """Determine which schematic symbol to use based on device name and port count"""
-    name_lower = name.lower()
-    for patterns, symbol in SYMBOL_PATTERNS:
-        if any(p in name_lower for p in patterns):
-            # Special handling for resistors - use port count to decide
-            if symbol == "Res3":
-                # 2-port resistors use "Res", 3+ port resistors use "Res3"
-                if num_ports <= 2:
-                    return "Res"
-                return "Res3"
-            return symbol
-    return "Nmos"  # Default fallback
+    symbol = _match_symbol(name.lower())
+    if symbol is None:
+        return "Nmos"  # Default fallback
+
+    # Special handling for resistors - use port count to decide
+    if symbol == "Res3":
+        # 2-port resistors use "Res", 3+ port resistors use "Res3"
+        if num_ports <= 2:
+            return "Res"
+        return "Res3"
+    return symbol
 
 
 def get_category(name: str) -> str:
     """Determine device category for organization"""
-    name_lower = name.lower()
-    for patterns, category in CATEGORY_PATTERNS:
-        if any(p in name_lower for p in patterns):
-            return category
-    return "other"
+    return _match_category(name.lower()) or "other"
+
+
+# Sentinel default for attribute lookups, distinguishing missing attributes from `None`-valued ones.
+# A single `getattr(obj, name, _MISSING)` replaces each `hasattr` + `getattr` pair, which looks the attribute up twice.
+_MISSING = object()
+
+# Port and parameter lists extracted from `Ports` and parameter classes, keyed by `id()` of the class.
+# PDK parameter classes are typically shared by many devices, so each is only walked once.
+# Entries hold the class itself, so that its `id` cannot be reused while the entry exists.
+_PORTS_CACHE: Dict[int, Tuple[type, Tuple[PortInfo, ...]]] = {}
+_PARAMS_CACHE: Dict[int, Tuple[type, Tuple[ParamInfo, ...]]] = {}
+_ANNOTATED_PARAMS_CACHE: Dict[int, Tuple[type, Tuple[ParamInfo, ...]]] = {}
+
+
+def _cached_per_class(cache: Dict[int, Tuple[type, tuple]], cls, build: Callable[[Any], list]) -> list:
+    """Get the list produced by `build(cls)`, memoized in `cache` per class.
+    Returns a new list on each call; the (frozen) items themselves are shared."""
+    entry = cache.get(id(cls))
+    if entry is None or entry[0] is not cls:
+        entry = cache[id(cls)] = (cls, tuple(build(cls)))
+    return list(entry[1])
+
+
+def _ports_from_ports_class(ports_cls) -> List[PortInfo]:
+    """Extract ports from the annotations of a `Ports` class"""
+    # Get annotations which define the port names
+    annotations = getattr(ports_cls, "__annotations__", {})
+    return [PortInfo(name=port_name, direction=_INOUT) for port_name in annotations]
 
 
 def extract_ports_from_device(obj) -> List[PortInfo]:
@@ -130,181 +249,206 @@ def extract_ports_from_device(obj) -> List[PortInfo]:
     ports = []
 
     # Check for ExternalModule instance with port_list
-    if hasattr(obj, "port_list") and obj.port_list:
-        for port in obj.port_list:
+    port_list = getattr(obj, "port_list", None)
+    if port_list:
+        for port in port_list:
             port_name = getattr(port, "name", None)
             if port_name:
-                ports.append(PortInfo(name=port_name, direction="inout"))
+                ports.append(PortInfo(name=_intern(port_name), direction=_INOUT))
         return ports
 
     # Try to get ports from the Ports class attribute (for classes)
-    if inspect.isclass(obj) and hasattr(obj, "Ports"):
-        ports_cls = obj.Ports
-        # Get annotations which define the port names
-        annotations = getattr(ports_cls, "__annotations__", {})
-        for port_name in annotations:
-            ports.append(PortInfo(name=port_name, direction="inout"))
+    if isinstance(obj, type):
+        ports_cls = getattr(obj, "Ports", _MISSING)
+        if ports_cls is not _MISSING:
+            ports = _cached_per_class(_PORTS_CACHE, ports_cls, _ports_from_ports_class)
 
     # If no ports found, try common port patterns based on device name
     if not ports:
         # Get name from object
-        if hasattr(obj, "name"):
-            name_lower = obj.name.lower()
-        elif hasattr(obj, "__name__"):
-            name_lower = obj.__name__.lower()
-        else:
-            name_lower = ""
-
-        if any(p in name_lower for p in ["nmos", "pmos", "nch", "pch", "nfet", "pfet", "fet"]):
-            ports = [
-                PortInfo(name="d", direction="inout"),
-                PortInfo(name="g", direction="inout"),
-                PortInfo(name="s", direction="inout"),
-                PortInfo(name="b", direction="inout"),
-            ]
-        elif any(p in name_lower for p in ["res", "cap", "ind"]):
-            ports = [
-                PortInfo(name="p", direction="inout"),
-                PortInfo(name="n", direction="inout"),
-            ]
-        elif "diode" in name_lower:
-            ports = [
-                PortInfo(name="p", direction="inout"),
-                PortInfo(name="n", direction="inout"),
-            ]
-        elif any(p in name_lower for p in ["npn", "pnp", "bjt"]):
-            ports = [
-                PortInfo(name="c", direction="inout"),
-                PortInfo(name="b", direction="inout"),
-                PortInfo(name="e", direction="inout"),
-            ]
+        name = getattr(obj, "name", _MISSING)
+        if name is _MISSING:
+            name = getattr(obj, "__name__", "")
+        name_lower = name.lower()
+
+        match = _DEFAULT_PORTS_RE.match(name_lower)
+        if match is not None:
+            port_names = DEFAULT_PORT_PATTERNS[int(match.lastgroup[1:])][1]
+            ports = [PortInfo(name=port_name, direction=_INOUT) for port_name in port_names]
 
     return ports
 
 
-def extract_params_from_device(obj) -> List[ParamInfo]:
-    """Extract parameter information from an HDL21 device (class or ExternalModule instance)"""
+def _type_name(dtype, default: str) -> str:
+    """Interned display name of `dtype`: its `__name__` if it has one, else its string form.
+    Returns `default` if `dtype` is `_MISSING`."""
+    if dtype is _MISSING:
+        return default
+    name = getattr(dtype, "__name__", _MISSING)
+    return _intern(str(dtype) if name is _MISSING else name)
+
+
+def _params_from_paramclass(params_cls) -> List[ParamInfo]:
+    """Extract parameters from an HDL21 paramclass, or failing that, from its annotations"""
+    # HDL21 paramclass has __params__ attribute with param definitions
+    param_defs = getattr(params_cls, "__params__", _MISSING)
+    if param_defs is _MISSING:
+        return _params_from_annotations(params_cls)
+
     params = []
+    for param_name, param_def in param_defs.items():
+        # Extract default value
+        default_val = getattr(param_def, "default", None)
+        # Don't serialize complex hdl21 types
+        if default_val.__class__.__name__ in ("Literal", "Prefixed"):
+            default_val = str(default_val)
+
+        # Extract dtype
+        dtype = _type_name(getattr(param_def, "dtype", _MISSING), "Any")
+
+        # Extract description
+        desc = getattr(param_def, "desc", None) or ""
+
+        params.append(ParamInfo(
+            name=_intern(param_name),
+            dtype=dtype,
+            default=default_val if not callable(default_val) else None,
+            description=desc,
+        ))
+    return params
+
+
+def _params_from_annotations(params_cls) -> List[ParamInfo]:
+    """Extract parameters from the annotations and class-level defaults of `params_cls`"""
+    params = []
+    annotations = getattr(params_cls, "__annotations__", {})
+
+    for param_name, param_type in annotations.items():
+        default_val = getattr(params_cls, param_name, None)
+
+        # Try to get the actual default value
+        inner = getattr(default_val, "default", _MISSING)
+        if inner is _MISSING:
+            inner = getattr(default_val, "value", _MISSING)
+        if inner is not _MISSING:
+            default_val = inner
+
+        params.append(ParamInfo(
+            name=_intern(param_name),
+            dtype=_type_name(param_type, "Any"),
+            default=default_val if not callable(default_val) else None,
+            description="",
+        ))
+    return params
 
+
+def extract_params_from_device(obj) -> List[ParamInfo]:
+    """Extract parameter information from an HDL21 device (class or ExternalModule instance)"""
     # Check for ExternalModule instance with paramtype
-    if hasattr(obj, "paramtype") and obj.paramtype is not None:
-        params_cls = obj.paramtype
-        # HDL21 paramclass has __params__ attribute with param definitions
-        if hasattr(params_cls, "__params__"):
-            for param_name, param_def in params_cls.__params__.items():
-                default_val = None
-                dtype = "Any"
-                desc = ""
-
-                # Extract default value
-                if hasattr(param_def, "default"):
-                    default_val = param_def.default
-                    # Don't serialize complex hdl21 types
-                    if hasattr(default_val, "__class__") and default_val.__class__.__name__ in ["Literal", "Prefixed"]:
-                        default_val = str(default_val)
-
-                # Extract dtype
-                if hasattr(param_def, "dtype"):
-                    dtype = getattr(param_def.dtype, "__name__", str(param_def.dtype))
-
-                # Extract description
-                if hasattr(param_def, "desc"):
-                    desc = param_def.desc or ""
-
-                params.append(ParamInfo(
-                    name=param_name,
-                    dtype=dtype,
-                    default=default_val if not callable(default_val) else None,
-                    description=desc,
-                ))
-            return params
-
-        # Fallback: try annotations
-        annotations = getattr(params_cls, "__annotations__", {})
-        for param_name, param_type in annotations.items():
-            default_val = getattr(params_cls, param_name, None)
-
-            if hasattr(default_val, "default"):
-                default_val = default_val.default
-            elif hasattr(default_val, "value"):
-                default_val = default_val.value
-
-            params.append(ParamInfo(
-                name=param_name,
-                dtype=str(param_type.__name__ if hasattr(param_type, "__name__") else param_type),
-                default=default_val if not callable(default_val) else None,
-                description="",
-            ))
-        return params
+    paramtype = getattr(obj, "paramtype", None)
+    if paramtype is not None:
+        return _cached_per_class(_PARAMS_CACHE, paramtype, _params_from_paramclass)
 
     # Try to get params from the Params class attribute (for classes)
-    if inspect.isclass(obj) and hasattr(obj, "Params"):
-        params_cls = obj.Params
-        annotations = getattr(params_cls, "__annotations__", {})
-
-        for param_name, param_type in annotations.items():
-            default_val = getattr(params_cls, param_name, None)
-
-            # Try to get the actual default value
-            if hasattr(default_val, "default"):
-                default_val = default_val.default
-            elif hasattr(default_val, "value"):
-                default_val = default_val.value
-
-            params.append(ParamInfo(
-                name=param_name,
-                dtype=str(param_type.__name__ if hasattr(param_type, "__name__") else param_type),
-                default=default_val if not callable(default_val) else None,
-                description="",
-            ))
-
-    return params
+    if isinstance(obj, type):
+        params_cls = getattr(obj, "Params", _MISSING)
+        if params_cls is not _MISSING:
+            return _cached_per_class(_ANNOTATED_PARAMS_CACHE, params_cls, _params_from_annotations)
+
+    return []
+
+
+# Types which are never HDL21 devices: modules, plain classes, functions, and builtin data.
+# Module namespaces are mostly made of these, and they are rejected without any attribute lookups.
+_NON_DEVICE_TYPES = frozenset(
+    {
+        type,
+        type(sys),
+        type(lambda: 0),
+        type(len),
+        str,
+        int,
+        float,
+        complex,
+        bool,
+        bytes,
+        tuple,
+        list,
+        dict,
+        set,
+        frozenset,
+        type(None),
+    }
+)
+
+# Attributes which identify an ExternalModule-like device
+_DEVICE_ATTRS = ("port_list", "paramtype", "domain", "name")
+
+# Types whose every instance has the ExternalModule "shape" checked by `is_hdl21_device`.
+# Only positive, type-wide answers are kept: other instances may carry the attributes themselves.
+_DEVICE_TYPES: Dict[type, bool] = {}
+
+
+def _has_device_attrs(obj) -> bool:
+    """Whether `obj` has all of the ExternalModule-identifying `_DEVICE_ATTRS`"""
+    return all(getattr(obj, attr, _MISSING) is not _MISSING for attr in _DEVICE_ATTRS)
 
 
 def is_hdl21_device(obj) -> bool:
     """Check if object is an HDL21 device (ExternalModule instance)"""
-    # Get the class name for filtering
-    cls_name = type(obj).__name__
+    obj_type = type(obj)
 
-    # Check if it's an ExternalModule instance (the main target for PDK devices)
-    # ExternalModule instances have port_list, paramtype, domain, and name attributes
-    if cls_name == "ExternalModule" or (
-        hasattr(obj, "port_list") and
-        hasattr(obj, "paramtype") and
-        hasattr(obj, "domain") and
-        hasattr(obj, "name")
-    ):
-        # Make sure it has actual ports (not just an empty list or None)
-        port_list = getattr(obj, "port_list", None)
-        if port_list and len(port_list) > 0:
-            return True
-
-    # Skip classes - we're mainly interested in ExternalModule instances for PDKs
+    # Skip classes and other common non-device types, without inspecting them any further.
     # Classes like Mos, Diode, etc. are HDL21 primitives, not PDK devices
-    if inspect.isclass(obj):
+    if obj_type in _NON_DEVICE_TYPES:
         return False
 
-    return False
+    # Check if it's an ExternalModule instance (the main target for PDK devices)
+    # ExternalModule instances have port_list, paramtype, domain, and name attributes.
+    # Types which provide that shape to all their instances are remembered;
+    # anything else (e.g. classes, or duck-typed instances) is checked individually.
+    if isinstance(obj, type):
+        is_device = _has_device_attrs(obj)
+    elif obj_type in _DEVICE_TYPES:
+        is_device = True
+    elif obj_type.__name__ == "ExternalModule" or _has_device_attrs(obj_type):
+        _DEVICE_TYPES[obj_type] = True
+        is_device = True
+    else:
+        is_device = _has_device_attrs(obj)
+    if not is_device:
+        return False
+
+    # Make sure it has actual ports (not just an empty list or None)
+    port_list = getattr(obj, "port_list", None)
+    return bool(port_list)
 
 
 def introspect_module(module, module_name: str) -> List[DeviceInfo]:
     """Extract all devices from a module (classes or ExternalModule instances)"""
     devices = []
 
-    for attr_name, obj in inspect.getmembers(module):
+    # Walk the module's namespace directly, rather than via `inspect.getmembers`, which re-fetches every attribute.
+    # Members are sorted by name, as `getmembers` returns them, which sets the order devices are listed in.
+    # Sorting also snapshots the namespace: other discovery threads may be importing submodules,
+    # which adds attributes to their parent package.
+    # Modules with a (PEP 562) `__getattr__` may load attributes lazily; these still go through `getmembers`.
+    namespace = vars(module)
+    if "__getattr__" in namespace:
+        import inspect
+
+        members = inspect.getmembers(module)
+    else:
+        members = sorted(namespace.items())
+
+    for attr_name, obj in members:
         # Skip private/internal items
         if attr_name.startswith("_"):
             continue
 
         if is_hdl21_device(obj):
             try:
-                # For ExternalModule instances, use the PDK device name if available
-                if hasattr(obj, "name"):
-                    device_name = obj.name  # The actual PDK device name
-                    display_name = attr_name  # The Python variable name for display
-                else:
-                    device_name = attr_name
-                    display_name = attr_name
+                display_name = attr_name  # The Python variable name for display
 
                 ports = extract_ports_from_device(obj)
                 device = DeviceInfo(
@@ -323,6 +467,49 @@ def introspect_module(module, module_name: str) -> List[DeviceInfo]:
     return devices
 
 
+# Submodules of PDK packages which are never searched for devices
+SKIP_SUBMODULES = frozenset({"test", "tests", "conftest"})
+
+
+def _import_module(name: str):
+    """Import module `name`, reusing it directly if already (fully) imported.
+    Returns `None` for modules blocked by a `None` entry in `sys.modules`,
+    and raises `ImportError` for those which cannot be imported."""
+    module = sys.modules.get(name, _MISSING)
+    if module is None:
+        return None
+    if module is _MISSING or getattr(getattr(module, "__spec__", None), "_initializing", False):
+        # Not yet imported, or still being imported by another thread
+        import importlib
+
+        return importlib.import_module(name)
+    return module
+
+
+def introspect_submodules(module, module_name: str, skip: frozenset = SKIP_SUBMODULES) -> List[DeviceInfo]:
+    """Extract all devices from the submodules of package `module`, other than those named in `skip`"""
+    devices = []
+
+    try:
+        import pkgutil
+        for importer, submod_name, ispkg in pkgutil.iter_modules(module.__path__):
+            # Skip already handled, test, and internal modules
+            if submod_name in skip or submod_name.startswith("test_"):
+                continue
+            full_name = f"{module_name}.{submod_name}"
+            try:
+                submodule = _import_module(full_name)
+                if submodule is not None:
+                    devices.extend(introspect_module(submodule, full_name))
+            except Exception:
+                # Skip modules that fail to import (e.g., missing deps)
+                continue
+    except Exception:
+        pass
+
+    return devices
+
+
 def discover_pdk(package_name: str, module_name: str) -> Optional[PdkInfo]:
     """Discover and introspect a single PDK package"""
     try:
@@ -338,34 +525,46 @@ def discover_pdk(package_name: str, module_name: str) -> Optional[PdkInfo]:
         except metadata.PackageNotFoundError:
             return None
 
+        return _introspect_pdk(package_name, module_name, version)
+    except Exception as e:
+        return None
+
+
+# Introspected installed PDKs, by (package name, module name, version).
+# Cleared by `invalidate_discovery_cache`.
+_INTROSPECTED_PDKS: Dict[Tuple[str, str, str], PdkInfo] = {}
+
+
+def _introspect_pdk(package_name: str, module_name: str, version: str) -> Optional[PdkInfo]:
+    """Import and introspect an installed PDK package, cached per installed version.
+    Failures are not cached, as they may be transient (e.g. an import racing another thread's),
+    and are retried on the next discovery."""
+    key = (package_name, module_name, version)
+    pdk = _INTROSPECTED_PDKS.get(key)
+    if pdk is None:
+        pdk = _introspect_pdk_uncached(package_name, module_name, version)
+        if pdk is not None:
+            _INTROSPECTED_PDKS[key] = pdk
+    return pdk
+
+
+def _introspect_pdk_uncached(package_name: str, module_name: str, version: str) -> Optional[PdkInfo]:
+    """Import and introspect an installed PDK package"""
+    try:
         # Try to import the module
         try:
-            module = importlib.import_module(module_name)
+            module = _import_module(module_name)
         except ImportError:
             return None
+        if module is None:
+            return None
 
         # Introspect devices
         devices = introspect_module(module, module_name)
 
         # Also check submodules if they exist
         if hasattr(module, "__path__"):
-            try:
-                import pkgutil
-                # Submodules to skip
-                skip_submodules = {"test", "tests", "conftest"}
-                for importer, submod_name, ispkg in pkgutil.iter_modules(module.__path__):
-                    # Skip test and internal modules
-                    if submod_name in skip_submodules or submod_name.startswith("test_"):
-                        continue
-                    try:
-                        submodule = importlib.import_module(f"{module_name}.{submod_name}")
-                        sub_devices = introspect_module(submodule, f"{module_name}.{submod_name}")
-                        devices.extend(sub_devices)
-                    except Exception:
-                        # Skip modules that fail to import
-                        continue
-            except Exception:
-                pass
+            devices.extend(introspect_submodules(module, module_name))
 
         return PdkInfo(
             name=package_name,
@@ -373,29 +572,85 @@ def discover_pdk(package_name: str, module_name: str) -> Optional[PdkInfo]:
             description=getattr(module, "__doc__", "") or f"HDL21 PDK: {package_name}",
             devices=devices,
         )
-    except Exception as e:
+    except Exception:
         return None
 
 
-def discover_local_pdk(pdk_path: str) -> Optional[PdkInfo]:
-    """Discover a PDK from a local directory"""
+# Cached `get_pyproject_version` results, by path: (modification time, version)
+_PYPROJECT_VERSIONS: Dict[str, Tuple[int, Optional[str]]] = {}
+
+
+def get_pyproject_version(pyproject_path: str) -> Optional[str]:
+    """Get the package version from a `pyproject.toml` file, if it exists and declares one.
+    Reads PEP 621 `project.version`, or Poetry's `tool.poetry.version`.
+    Results are cached until the file is modified."""
     import os
 
-    if not os.path.isdir(pdk_path):
+    try:
+        mtime = os.stat(pyproject_path).st_mtime_ns
+    except OSError:
+        return None
+
+    cached = _PYPROJECT_VERSIONS.get(pyproject_path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    version = _read_pyproject_version(pyproject_path)
+    _PYPROJECT_VERSIONS[pyproject_path] = (mtime, version)
+    return version
+
+
+def _read_pyproject_version(pyproject_path: str) -> Optional[str]:
+    """Read the package version from a `pyproject.toml` file. Uncached."""
+    try:
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            import tomli as tomllib
+    except ImportError:
+        # No TOML parser available. Fall back to the first line which sets a `version`.
+        try:
+            with open(pyproject_path, "r") as f:
+                for line in f:
+                    if line.strip().startswith("version"):
+                        return line.split("=")[1].strip().strip('"\'')
+        except Exception:
+            pass
+        return None
+
+    try:
+        with open(pyproject_path, "rb") as f:
+            data = tomllib.load(f)
+    except (OSError, tomllib.TOMLDecodeError):
         return None
 
+    version = data.get("project", {}).get("version")
+    if version is None:
+        version = data.get("tool", {}).get("poetry", {}).get("version")
+    return version if isinstance(version, str) else None
+
+
+# Local PDKs have their `primitives` submodule introspected first, and separately
+_LOCAL_SKIP_SUBMODULES = SKIP_SUBMODULES | {"primitives"}
+
+
+def discover_local_pdk(pdk_path: str) -> Optional[PdkInfo]:
+    """Discover a PDK from a local directory"""
+    import os
+
     # Find the module directory (look for __init__.py)
+    # `scandir` entries carry their file type from the directory listing itself,
+    # saving a `stat` call per entry.
     module_name = None
-    module_dir = None
 
-    for item in os.listdir(pdk_path):
-        item_path = os.path.join(pdk_path, item)
-        if os.path.isdir(item_path):
-            init_file = os.path.join(item_path, "__init__.py")
-            if os.path.exists(init_file):
-                module_name = item
-                module_dir = item_path
-                break
+    try:
+        with os.scandir(pdk_path) as entries:
+            for entry in entries:
+                if entry.is_dir() and os.path.isfile(os.path.join(entry.path, "__init__.py")):
+                    module_name = entry.name
+                    break
+    except OSError:  # Missing, or not a directory
+        return None
 
     if not module_name:
         return None
@@ -407,52 +662,28 @@ def discover_local_pdk(pdk_path: str) -> Optional[PdkInfo]:
 
     try:
         # Try to import the module
-        module = importlib.import_module(module_name)
+        module = _import_module(module_name)
+        if module is None:
+            return None
 
         # Get version from pyproject.toml if available
-        version = "local"
-        pyproject_path = os.path.join(pdk_path, "pyproject.toml")
-        if os.path.exists(pyproject_path):
-            try:
-                with open(pyproject_path, "r") as f:
-                    content = f.read()
-                    for line in content.split("\n"):
-                        if line.strip().startswith("version"):
-                            version = line.split("=")[1].strip().strip('"\'')
-                            break
-            except:
-                pass
+        version = get_pyproject_version(os.path.join(pdk_path, "pyproject.toml")) or "local"
 
         # Introspect devices from the main module
         devices = introspect_module(module, module_name)
 
         # Also check primitives submodule which is common in HDL21 PDKs
         try:
-            primitives = importlib.import_module(f"{module_name}.primitives")
-            prim_devices = introspect_module(primitives, f"{module_name}.primitives")
-            devices.extend(prim_devices)
+            primitives = _import_module(f"{module_name}.primitives")
+            if primitives is not None:
+                prim_devices = introspect_module(primitives, f"{module_name}.primitives")
+                devices.extend(prim_devices)
         except ImportError:
             pass
 
         # Check for submodules
         if hasattr(module, "__path__"):
-            try:
-                import pkgutil
-                # Submodules to skip
-                skip_submodules = {"primitives", "test", "tests", "conftest"}
-                for importer, submod_name, ispkg in pkgutil.iter_modules(module.__path__):
-                    # Skip already handled, test, and internal modules
-                    if submod_name in skip_submodules or submod_name.startswith("test_"):
-                        continue
-                    try:
-                        submodule = importlib.import_module(f"{module_name}.{submod_name}")
-                        sub_devices = introspect_module(submodule, f"{module_name}.{submod_name}")
-                        devices.extend(sub_devices)
-                    except Exception:
-                        # Skip modules that fail to import (e.g., missing deps)
-                        continue
-            except Exception:
-                pass
+            devices.extend(introspect_submodules(module, module_name, _LOCAL_SKIP_SUBMODULES))
 
         # Get PDK name from directory name
         pdk_name = os.path.basename(pdk_path)
@@ -468,16 +699,147 @@ def discover_local_pdk(pdk_path: str) -> Optional[PdkInfo]:
 
 
 def discover_all_pdks() -> List[PdkInfo]:
-    """Discover all installed and local HDL21 PDKs"""
-    pdks = []
+    """Discover all installed and local HDL21 PDKs.
+
+    Results are cached for as long as the set of searched PDKs is unchanged,
+    so repeated commands do not re-import and re-introspect every PDK.
+    Use `invalidate_discovery_cache` to force a fresh discovery."""
+    key = _discovery_cache_key()
+    cached, cached_key = _DISCOVERY_CACHE, _DISCOVERY_CACHE_KEY
+    if cached is not None and cached_key == key:
+        return cached
+
+    generation = _DISCOVERY_GENERATION
+    pdks = _discover_all_pdks()
+    _set_discovery_cache(pdks, key, generation)
+    return pdks
+
+
+def iter_discover_pdks() -> Iterator[PdkInfo]:
+    """Discover all installed and local HDL21 PDKs, yielding each as soon as it has been introspected.
+
+    Yields PDKs in the order they complete, rather than the (priority) order of `discover_all_pdks`,
+    with which it shares its cache: once iteration completes, the results are cached for both."""
+    key = _discovery_cache_key()
+    cached, cached_key = _DISCOVERY_CACHE, _DISCOVERY_CACHE_KEY
+    if cached is not None and cached_key == key:
+        yield from cached
+        return
+
+    generation = _DISCOVERY_GENERATION
+    discovered = []
+    for position, pdk in _iter_discover_pdks():
+        discovered.append((position, pdk))
+        yield pdk
+    _set_discovery_cache(_in_position_order(discovered), key, generation)
+
+
+def _discovery_cache_key() -> tuple:
+    """Key identifying the set of searched PDKs, which the discovery cache is valid for"""
+    return (tuple(LOCAL_PDK_PATHS), tuple(KNOWN_PDKS.items()))
+
+
+def _set_discovery_cache(pdks: List[PdkInfo], key: tuple, generation: int) -> None:
+    """Cache discovered `pdks`, and (re-)build the indices derived from them.
+    Skipped if the cache has been invalidated since `generation`, i.e. since discovery started."""
+    global _DISCOVERY_CACHE, _DISCOVERY_CACHE_KEY, _DEVICE_INDEX, _DISCOVERY_DICTS
+
+    index = {}
+    for pdk in pdks:
+        for device in pdk.devices:
+            # Keep the first of any duplicates, as a linear search would find
+            index.setdefault((pdk.name, device.name), device)
+
+    with _DISCOVERY_LOCK:
+        if generation != _DISCOVERY_GENERATION:
+            return
+        _DISCOVERY_CACHE = pdks
+        _DISCOVERY_CACHE_KEY = key
+        _DEVICE_INDEX = index
+        _DISCOVERY_DICTS = None
+
+
+def discover_all_pdk_dicts() -> List[Dict[str, Any]]:
+    """Get `discover_all_pdks` in serialized (`asdict`) form.
+    Cached alongside the discovery results, as `asdict` deep-copies every device."""
+    global _DISCOVERY_DICTS
+
+    generation = _DISCOVERY_GENERATION
+    pdks = discover_all_pdks()
+    dicts = _DISCOVERY_DICTS
+    if dicts is None:
+        dicts = [asdict(p) for p in pdks]
+        with _DISCOVERY_LOCK:
+            # Only cache these if `pdks` are still the cached results
+            if generation == _DISCOVERY_GENERATION and pdks is _DISCOVERY_CACHE:
+                _DISCOVERY_DICTS = dicts
+    return dicts
+
+
+def find_device(pdk_name: str, device_name: str) -> Optional[DeviceInfo]:
+    """Look up a discovered device by PDK and device name"""
+    pdks = discover_all_pdks()  # Ensure the index is current
+    index = _DEVICE_INDEX
+    if pdks is not _DISCOVERY_CACHE:
+        # Discovery overlapped an invalidation, and its results were not cached (nor indexed). Search them directly.
+        return next(
+            (d for p in pdks if p.name == pdk_name for d in p.devices if d.name == device_name),
+            None,
+        )
+    return index.get((pdk_name, device_name))
+
+
+def invalidate_discovery_cache() -> None:
+    """Clear all cached discovery results, including those of any discovery still in progress"""
+    global _DISCOVERY_CACHE, _DISCOVERY_CACHE_KEY, _DEVICE_INDEX, _DISCOVERY_DICTS, _DISCOVERY_GENERATION
+    with _DISCOVERY_LOCK:
+        _DISCOVERY_GENERATION += 1
+        _DISCOVERY_CACHE = None
+        _DISCOVERY_CACHE_KEY = None
+        _DEVICE_INDEX = {}
+        _DISCOVERY_DICTS = None
+    _INTROSPECTED_PDKS.clear()
+    _PORTS_CACHE.clear()
+    _PARAMS_CACHE.clear()
+    _ANNOTATED_PARAMS_CACHE.clear()
+    _DEVICE_TYPES.clear()
+
+
+def _iter_concurrently(fn, items: list) -> Iterator[Tuple[int, Any]]:
+    """Apply `fn` to each of `items` on a thread pool, yielding (index, result) pairs as each completes.
+    PDK discovery is dominated by module imports and file I/O, which overlap well across threads."""
+    if len(items) <= 1:
+        for index, item in enumerate(items):
+            yield index, fn(item)
+        return
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    with ThreadPoolExecutor(max_workers=min(16, len(items))) as pool:
+        futures = {pool.submit(fn, item): index for index, item in enumerate(items)}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def _in_position_order(discovered: List[Tuple[int, PdkInfo]]) -> List[PdkInfo]:
+    """Sort (position, pdk) pairs from `_iter_discover_pdks` into a list of PDKs in priority order"""
+    return [pdk for _, pdk in sorted(discovered, key=lambda pair: pair[0])]
+
+
+def _discover_all_pdks() -> List[PdkInfo]:
+    """Discover all installed and local HDL21 PDKs, bypassing the cache"""
+    return _in_position_order(list(_iter_discover_pdks()))
+
+
+def _iter_discover_pdks() -> Iterator[Tuple[int, PdkInfo]]:
+    """Discover all installed and local HDL21 PDKs, bypassing the cache.
+    Yields each PDK as soon as it is discovered, paired with its position in priority order."""
     seen_names = set()
     seen_modules = set()
 
     # First, discover from local paths (these take priority)
-    for local_path in LOCAL_PDK_PATHS:
-        pdk = discover_local_pdk(local_path)
+    local_paths = list(LOCAL_PDK_PATHS)
+    for index, pdk in _iter_concurrently(discover_local_pdk, local_paths):
         if pdk and pdk.devices:
-            pdks.append(pdk)
             # Track both the PDK name and likely package names
             pdk_lower = pdk.name.lower()
             seen_names.add(pdk_lower)
@@ -487,81 +849,156 @@ def discover_all_pdks() -> List[PdkInfo]:
                 if dev.module_path:
                     mod_name = dev.module_path.split(".")[0]
                     seen_modules.add(mod_name.lower())
-
-    # Then, discover installed packages (skip if local version exists)
-    for package_name, module_name in KNOWN_PDKS.items():
-        pkg_lower = package_name.lower()
-        mod_lower = module_name.lower()
-        # Skip if we already have this PDK from local path
-        if pkg_lower in seen_names or mod_lower in seen_modules:
+            yield index, pdk
+
+    # Then, discover installed packages (skip if local version exists).
+    # The local PDKs are all found first, so that an installed package never gets
+    # imported under the same module name as the local PDK which overrides it.
+    def is_overridden(package_name: str, module_name: str) -> bool:
+        return package_name.lower() in seen_names or module_name.lower() in seen_modules
+
+    candidates = [(p, m) for p, m in KNOWN_PDKS.items() if not is_overridden(p, m)]
+    discovered = _iter_concurrently(lambda pm: discover_pdk(*pm), candidates)
+    for index, pdk in discovered:
+        package_name, module_name = candidates[index]
+        if is_overridden(package_name, module_name):
             continue
-        pdk = discover_pdk(package_name, module_name)
         if pdk and pdk.devices:
-            pdks.append(pdk)
-            seen_names.add(pkg_lower)
-            seen_modules.add(mod_lower)
+            seen_names.add(package_name.lower())
+            seen_modules.add(module_name.lower())
+            yield len(local_paths) + index, pdk
 
-    return pdks
 
+# Timeout for `pip install`, in seconds
+INSTALL_TIMEOUT = 300
 
-def install_pdk(package_name: str) -> Dict[str, Any]:
-    """Install a PDK package using pip"""
+
+def install_pdk(package_name: str, on_output: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """Install a PDK package using pip.
+    If provided, `on_output` is called with each line of pip's output as it is produced."""
     import subprocess
 
+    process = None
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        process.kill()
+
     try:
-        result = subprocess.run(
+        process = subprocess.Popen(
             [sys.executable, "-m", "pip", "install", package_name],
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             text=True,
-            timeout=300,  # 5 minute timeout
         )
-
+        timer = threading.Timer(INSTALL_TIMEOUT, kill)
+        timer.start()
+        try:
+            output = []
+            for line in process.stdout:
+                output.append(line)
+                if on_output is not None:
+                    on_output(line.rstrip("\n"))
+            returncode = process.wait()
+        finally:
+            timer.cancel()
+
+        if timed_out.is_set():
+            return {"status": "error", "output": "Installation timed out", "returncode": -1}
         return {
-            "status": "ok" if result.returncode == 0 else "error",
-            "output": result.stdout + result.stderr,
-            "returncode": result.returncode,
+            "status": "ok" if returncode == 0 else "error",
+            "output": "".join(output),
+            "returncode": returncode,
         }
-    except subprocess.TimeoutExpired:
-        return {"status": "error", "output": "Installation timed out", "returncode": -1}
     except Exception as e:
         return {"status": "error", "output": str(e), "returncode": -1}
+    finally:
+        if process is not None:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+
+
+def install_pdk_in_background(package_name: str, request_id: Any, send: Callable[[Dict[str, Any]], None]) -> None:
+    """Install a PDK package on a worker thread, reporting its progress via `send`.
+
+    Each line of pip's output is sent as a `progress` response, and the final result as
+    an `ok` or `error` response, all tagged with the requesting command's `id`."""
+
+    def run():
+        def progress(line: str):
+            send({"status": "progress", "id": request_id, "line": line})
+
+        result = install_pdk(package_name, progress)
+        invalidate_discovery_cache()
+        send(dict(result, id=request_id))
+
+    threading.Thread(target=run, name=f"install-{package_name}").start()
+
+
+def stream_discovery() -> Iterator[Dict[str, Any]]:
+    """Discover all PDKs as a stream of responses: one `partial` response per PDK, as each is discovered,
+    followed by a final `ok` response."""
+    for pdk in iter_discover_pdks():
+        yield {"status": "partial", "pdk": asdict(pdk)}
+    yield {"status": "ok", "done": True}
+
 
+def handle_command(
+    cmd: Dict[str, Any], send: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Union[Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """Handle incoming commands from VSCode extension
 
-def handle_command(cmd: Dict[str, Any]) -> Dict[str, Any]:
-    """Handle incoming commands from VSCode extension"""
+    Most commands produce a single response. Streaming commands (`discover_stream`)
+    instead return a generator of responses, to be sent as they are produced.
+
+    Commands may also complete in the background, e.g. `install` with `"background": true`,
+    if given a `send` function for their later responses. They are then answered immediately
+    with a `started` response, and their `id` tags each response sent later."""
     action = cmd.get("action")
 
     if action == "discover":
-        pdks = discover_all_pdks()
         return {
             "status": "ok",
-            "pdks": [asdict(p) for p in pdks],
+            "pdks": discover_all_pdk_dicts(),
         }
 
+    elif action == "discover_stream":
+        return stream_discovery()
+
     elif action == "add_local_path":
         path = cmd.get("path")
         if not path:
             return {"status": "error", "message": "No path specified"}
         if path not in LOCAL_PDK_PATHS:
             LOCAL_PDK_PATHS.append(path)
+            invalidate_discovery_cache()
         return {"status": "ok", "message": f"Added local PDK path: {path}"}
 
     elif action == "install":
         package = cmd.get("package")
         if not package:
             return {"status": "error", "message": "No package specified"}
-        return install_pdk(package)
+        if cmd.get("background") and send is not None:
+            install_pdk_in_background(package, cmd.get("id"), send)
+            return {"status": "started", "id": cmd.get("id")}
+        result = install_pdk(package)
+        invalidate_discovery_cache()
+        return result
+
+    elif action == "refresh":
+        invalidate_discovery_cache()
+        return {"status": "ok", "message": "Discovery cache cleared"}
 
     elif action == "get_device_details":
         pdk_name = cmd.get("pdk")
         device_name = cmd.get("device")
 
-        pdks = discover_all_pdks()
-        for pdk in pdks:
-            if pdk.name == pdk_name:
-                for device in pdk.devices:
-                    if device.name == device_name:
-                        return {"status": "ok", "device": asdict(device)}
+        device = find_device(pdk_name, device_name)
+        if device is not None:
+            return {"status": "ok", "device": asdict(device)}
 
         return {"status": "error", "message": f"Device {device_name} not found in {pdk_name}"}
 
@@ -572,30 +1009,148 @@ def handle_command(cmd: Dict[str, Any]) -> Dict[str, Any]:
         return {"status": "error", "message": f"Unknown action: {action}"}
 
 
-def main():
-    """Main entry point for stdin/stdout communication"""
-    # Ensure stdout is line-buffered
-    sys.stdout.reconfigure(line_buffering=True)
+def handle_batch(cmds: List[Any]) -> List[Dict[str, Any]]:
+    """Handle a JSON-RPC style batch of commands.
+
+    Each element is dispatched through `handle_command` in order, and a failure
+    in one element is reported in its own response without affecting the others.
+    The responses of streaming commands are collected into a list, in place of a single response.
+    """
+    results = []
+    for cmd in cmds:
+        try:
+            result = handle_command(cmd)
+            if isinstance(result, GeneratorType):
+                result = list(result)
+            results.append(result)
+        except Exception as e:
+            results.append({"status": "error", "message": str(e)})
+    return results
+
 
-    for line in sys.stdin:
-        line = line.strip()
+def read_message(stream) -> Optional[Tuple[bytes, bool]]:
+    """Read a single request message from binary `stream`.
+
+    Messages are either a single line of JSON, or LSP-style framed: a `Content-Length` header,
+    a blank line, and then exactly that many bytes of JSON, which may themselves span lines.
+    Returns a tuple of the message payload and whether it was framed, or `None` at end of input.
+    Raises a `ValueError` for framed messages with an invalid header."""
+    line = stream.readline()
+    if not line:
+        return None
+    if not line[:8].lower() == b"content-":
+        return line, False
+
+    # Read headers, up to and including the blank line which ends them
+    length = None
+    while line.strip():
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            try:
+                length = int(value)
+            except ValueError:
+                raise ValueError(f"Invalid Content-Length header: {line!r}")
+        line = stream.readline()
         if not line:
+            return None
+    if length is None:
+        raise ValueError("Missing Content-Length header")
+
+    # Read the payload, in place, until it is complete
+    payload = bytearray(length)
+    view = memoryview(payload)
+    received = 0
+    while received < length:
+        count = stream.readinto(view[received:])
+        if not count:
+            return None
+        received += count
+    return payload, True
+
+
+# Serializes writes of whole messages, which may come from background commands' threads
+_WRITE_LOCK = threading.Lock()
+
+
+def write_message(stream, payload: bytes, framed: bool) -> None:
+    """Write a response message to binary `stream`, framed in the same manner as its request"""
+    if framed:
+        payload = b"Content-Length: %d\r\n\r\n" % len(payload) + payload
+    else:
+        payload = payload + b"\n"
+    with _WRITE_LOCK:
+        stream.write(payload)
+        stream.flush()
+
+
+def _send_response(stream, framed: bool, response: Dict[str, Any]) -> None:
+    """Encode and write a response to `stream`"""
+    write_message(stream, _dumps(response), framed)
+
+
+def main():
+    """Main entry point for stdin/stdout communication
+
+    Each input message is either a single command object, answered with a single
+    response object, or a JSON array of commands (a batch), answered with a JSON
+    array holding one response per command, in the same order:
+
+        {"action": "ping"}
+        [{"action": "ping"}, {"action": "get_device_details", "pdk": "...", "device": "..."}]
+
+    Messages are sent one per line, or framed with a `Content-Length` header
+    as in the Language Server Protocol (see `read_message`).
+    Each response is sent in the same format as its request.
+
+    Streaming commands (`discover_stream`) are answered with a series of responses,
+    each with `"status": "partial"`, terminated by a final `ok` or `error` response.
+
+    Background commands (`install` with `"background": true`) are answered with a `started`
+    response, and later with their `progress` and final responses, interleaved with the
+    responses to any other commands. All carry the `id` of the command, if it has one.
+    """
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+
+    while True:
+        try:
+            message = read_message(stdin)
+        except ValueError as e:
+            write_message(stdout, _dumps({"status": "error", "message": str(e)}), framed=True)
+            continue
+        if message is None:
+            break
+
+        payload, framed = message
+        if not payload.strip():
             continue
 
         try:
-            cmd = json.loads(line)
-            result = handle_command(cmd)
-            print(json.dumps(result), flush=True)
-        except json.JSONDecodeError as e:
-            print(json.dumps({
+            cmd = _loads(payload)
+            if isinstance(cmd, list):
+                if not cmd:
+                    result = {"status": "error", "message": "Empty batch"}
+                else:
+                    result = handle_batch(cmd)
+            else:
+                send = functools.partial(_send_response, stdout, framed)
+                result = handle_command(cmd, send)
+                if isinstance(result, GeneratorType):
+                    # Streaming command: send each response as soon as it is produced
+                    for response in result:
+                        write_message(stdout, _dumps(response), framed)
+                    continue
+            response = _dumps(result)
+        except json.JSONDecodeError as e:  # Also raised by `orjson`, as a subclass
+            response = _dumps({
                 "status": "error",
                 "message": f"Invalid JSON: {e}",
-            }), flush=True)
+            })
         except Exception as e:
-            print(json.dumps({
+            response = _dumps({
                 "status": "error",
                 "message": str(e),
-            }), flush=True)
+            })
+        write_message(stdout, response, framed)
 
 
 if __name__ == "__main__":
@@ -35,7 +35,8 @@ class SchSvgImporter(importlib.abc.MetaPathFinder):
     def find_spec(self, fullname: str, path: list, target=None):
         """Look for a `.sch.svg` file at `path`, or raise an `ImportError` if not found."""
 
-        if path is None:  # Absolute imports are not supported
+        # Absolute imports are not supported, nor are empty (e.g. namespace or `six.moves`) paths
+        if not path:
             return None
 
         # FIXME: this only works for "from . import name" for now!
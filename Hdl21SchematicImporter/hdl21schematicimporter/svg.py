@@ -4,16 +4,28 @@
 SVG format parsing and reading of string-valued `Circuit` content. 
 """
 
-import json
+import os
+import stat
+import errno
 from os import PathLike
+from dataclasses import replace
 from pathlib import Path
 from enum import Enum
-from xml.etree.ElementTree import parse, Element
+from xml.etree.ElementTree import iterparse, Element
 from typing import Optional
 
 # Local imports
-from .circuit import Circuit
-from .svgdefs import SchSvgIds, SchSvgClasses
+from .circuit import Circuit, make_connection
+from .svgdefs import SchSvgIds
+
+try:  # Use `orjson` to decode the circuit JSON where available, else the standard library
+    from orjson import loads as _loads
+except ImportError:
+    from json import loads as _loads
+
+
+# The SVG namespace, as prefixed to each tag by `xml.etree`
+SVG_NAMESPACE = "{http://www.w3.org/2000/svg}"
 
 
 class SvgTags(Enum):
@@ -28,16 +40,22 @@ class SvgTags(Enum):
     @staticmethod
     def from_etree_tag(etree_tag: str) -> Optional["SvgTags"]:
         """Converts an etree tag to a SvgTags enum value"""
-        if not etree_tag.startswith("{http://www.w3.org/2000/svg}"):
+        if not etree_tag.startswith(SVG_NAMESPACE):
             return None
         # Remove the namespace prefix, and convert to an `SvgTags` enum value
-        return SvgTags(etree_tag[len("{http://www.w3.org/2000/svg}") :])
+        return SvgTags(etree_tag[len(SVG_NAMESPACE) :])
 
     @staticmethod
     def from_element(element: Element) -> Optional["SvgTags"]:
         return SvgTags.from_etree_tag(element.tag)
 
 
+# Namespaced etree tags of the elements holding the circuit, compared directly against `Element.tag`.
+# This skips converting every visited tag to an `SvgTags`, and tolerates tags which have no `SvgTags` value.
+_DEFS_TAG = SVG_NAMESPACE + SvgTags.DEFS.value
+_TEXT_TAG = SVG_NAMESPACE + SvgTags.TEXT.value
+
+
 class SvgImporter:
     """
     # SvgImporter
@@ -51,14 +69,36 @@ class SvgImporter:
     def import_svg_file(self) -> str:
         """Import a the JSON-encoded Circuit string from an SVG file."""
 
-        # Parse the SVG content
-        self.root = parse(self.svg_file).getroot()
-
-        # Examine each child element, looking for the `circuit-defs`.
-        # Note this *does not* search hierarchically, only the top-level SVG element's children.
-        for element in self.root:
-            if self.is_this_schematic_defs(element):
-                return self.import_schematic_defs(element)
+        # Parse the SVG content incrementally, stopping as soon as the circuit is found.
+        # Elements are checked at the depth at which they are valid:
+        # the `circuit-defs` as a child of the top-level SVG element, and the circuit as a child of the `circuit-defs`.
+        # Note this *does not* search hierarchically, as in any deeper elements.
+        depth = 0
+        defs: Optional[Element] = None
+        with open(self.svg_file, "rb") as f:
+            for event, elem in iterparse(f, events=("start", "end")):
+                if event == "start":
+                    depth += 1
+                    if depth == 1:
+                        self.root = elem
+                    elif (
+                        depth == 2
+                        and defs is None
+                        and self.is_this_schematic_defs(elem)
+                    ):
+                        defs = elem
+                    continue
+
+                # End of an element; its text and children are now complete.
+                depth -= 1
+                if depth == 2 and defs is not None and self.is_this_the_circuit(elem):
+                    return self.make_circuit(elem.text)
+                if elem is defs:
+                    # The circuit-defs ended without a circuit; error time.
+                    return self.fail(f"No {SchSvgIds.CIRCUIT.value} found in {defs}")
+                if depth == 1:
+                    # Drop completed top-level elements, keeping memory flat on large schematics.
+                    self.root.remove(elem)
 
         # Not found; error time.
         return self.fail(f"No {SchSvgIds.DEFS.value} found in {self.svg_file}")
@@ -66,47 +106,33 @@ class SvgImporter:
     def is_this_schematic_defs(self, element: Element) -> bool:
         """Boolean indication of whether `element` is the `circuit-defs` element."""
 
-        svgtag = SvgTags.from_element(element)
-        if svgtag is None or svgtag != SvgTags.DEFS:
-            return False
-
-        # We have a `defs` element. Check its `id`.
-        elem_id = element.attrib.get(f"id", None)
-        return elem_id is not None and elem_id == SchSvgIds.DEFS.value
-
-    def import_schematic_defs(self, defs: Element) -> str:
-        """Import the string circuit content from its `defs` element."""
-
-        # The circuit-defs thus far contain a single text element.
-        # Look at any extras nonetheless, and return the string of the first class-matching element.
-        for elem in defs:
-            if self.is_this_the_circuit(elem):
-                return self.make_circuit(elem.text)
-
-        # Not found; error time.
-        return self.fail(f"No {SchSvgClasses.CIRCUIT} found in {defs}")
+        # Check for a `defs` element, and then its `id`.
+        return element.tag == _DEFS_TAG and element.get("id") == SchSvgIds.DEFS.value
 
     def is_this_the_circuit(self, elem: Element) -> bool:
         """Boolean indication of whether `elem` is the `circuit` element."""
 
-        if SvgTags.from_element(elem) != SvgTags.TEXT:
-            return False
-
-        # We have a `text` element. Check its `id`.
-        elem_id = elem.attrib.get(f"id", None)
-        return elem_id is not None and elem_id == SchSvgIds.CIRCUIT.value
+        # Check for a `text` element, and then its `id`.
+        return elem.tag == _TEXT_TAG and elem.get("id") == SchSvgIds.CIRCUIT.value
 
     def make_circuit(self, json_str: str) -> Circuit:
         """Create a `Circuit` from JSON-encoded text"""
 
         try:  # The main event: parse the JSON
-            circuit = Circuit(**json.loads(json_str))
+            data = _loads(json_str)
+            # Build each instance's connections up front, sharing those between the same (port, signal) pairs
+            for instance in data["instances"]:
+                instance["conns"] = [
+                    make_connection(c["portname"], c["signame"])
+                    for c in instance["conns"]
+                ]
+            circuit = Circuit(**data)
         except:
             return self.fail(f"Invalid Circuit, could not be parsed from {json_str}")
 
         # If the circuit has no name, use the file name prefix
         if not circuit.name:
-            circuit.name = self.svg_file.name.split(".")[0]
+            circuit = replace(circuit, name=self.svg_file.name.split(".")[0])
         return circuit
 
     def fail(self, msg: str):
@@ -115,7 +141,13 @@ class SvgImporter:
 
 
 def svg_to_circuit(svg_file: PathLike) -> Circuit:
-    """Import a schematic from an SVG file."""
+    """Import a schematic from an SVG file.
+    Raises a `FileNotFoundError` if `svg_file` does not exist, or an `IsADirectoryError` if it is a directory."""
+    svg_file = Path(svg_file)
+    if stat.S_ISDIR(os.stat(svg_file).st_mode):
+        raise IsADirectoryError(
+            errno.EISDIR, "Schematic path is a directory", str(svg_file)
+        )
     return SvgImporter(svg_file).import_svg_file()
 
 
@@ -1,30 +1,66 @@
 """
 Pytest configuration and fixtures for hdl21schematicimporter tests.
+
+Parsed circuits and generated code are session-scoped, and shared by every test which uses them.
+Tests must treat them as read-only: mutating a `Circuit` would leak into every later test.
 """
 
 import pytest
 from pathlib import Path
 
+from hdl21schematicimporter import svg_to_circuit, circuit_to_code
+from hdl21schematicimporter.circuit import Circuit
+
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def fixtures_dir() -> Path:
     """Return the path to the test fixtures directory."""
     return Path(__file__).parent / "fixtures"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def inverter_svg(fixtures_dir) -> Path:
     """Path to a simple inverter schematic SVG."""
     return fixtures_dir / "inverter.sch.svg"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def nand2_svg(fixtures_dir) -> Path:
     """Path to a NAND2 schematic with internal signals."""
     return fixtures_dir / "nand2.sch.svg"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def custom_prelude_svg(fixtures_dir) -> Path:
     """Path to a schematic with custom prelude and Params."""
     return fixtures_dir / "custom_prelude.sch.svg"
+
+
+@pytest.fixture(scope="session")
+def inverter_circuit(inverter_svg) -> Circuit:
+    """The inverter schematic, parsed once per session."""
+    return svg_to_circuit(inverter_svg)
+
+
+@pytest.fixture(scope="session")
+def inverter_code(inverter_circuit) -> str:
+    """Python code generated from the inverter schematic."""
+    return circuit_to_code(inverter_circuit)
+
+
+@pytest.fixture(scope="session")
+def nand2_circuit(nand2_svg) -> Circuit:
+    """The NAND2 schematic, parsed once per session."""
+    return svg_to_circuit(nand2_svg)
+
+
+@pytest.fixture(scope="session")
+def nand2_code(nand2_circuit) -> str:
+    """Python code generated from the NAND2 schematic."""
+    return circuit_to_code(nand2_circuit)
+
+
+@pytest.fixture(scope="session")
+def custom_prelude_circuit(custom_prelude_svg) -> Circuit:
+    """The custom-prelude schematic, parsed once per session."""
+    return svg_to_circuit(custom_prelude_svg)
@@ -4,6 +4,10 @@ Tests for hdl21schematicimporter.
 Tests SVG parsing, circuit model, code generation, and Python import mechanics.
 """
 
+import os
+import sys
+import subprocess
+import dataclasses
 from pathlib import Path
 from types import SimpleNamespace
 
@@ -15,7 +19,14 @@ from hdl21schematicimporter import (
     circuit_to_code,
     import_schematic,
 )
-from hdl21schematicimporter.circuit import Circuit, Signal, Instance, Connection, PortDir
+from hdl21schematicimporter.circuit import (
+    Circuit,
+    Signal,
+    Instance,
+    Connection,
+    PortDir,
+    make_connection,
+)
 
 
 class TestVersion:
@@ -29,6 +40,15 @@ class TestVersion:
         assert len(parts) == 3
         assert all(p.isdigit() for p in parts)
 
+    def test_import_does_not_load_hdl21(self):
+        """`hdl21` is only imported on first use, e.g. via the package's `hdl21` attribute."""
+        code = (
+            "import sys, hdl21schematicimporter as m; "
+            "assert 'hdl21' not in sys.modules; "
+            "assert m.hdl21 is sys.modules['hdl21']"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
+
 
 class TestCircuitModel:
     """Tests for the Circuit data model classes."""
@@ -50,11 +70,25 @@ class TestCircuitModel:
         sig = Signal(name="internal_net", portdir=PortDir.INTERNAL)
         assert sig.portdir == PortDir.INTERNAL
 
+    def test_signal_portdir_from_json_string(self):
+        sig = Signal(name="clk", portdir="INPUT")
+        assert sig.portdir is PortDir.INPUT
+
+    def test_signal_is_frozen(self):
+        sig = Signal(name="clk", portdir=PortDir.INPUT)
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            sig.name = "other"
+
     def test_connection(self):
         conn = Connection(portname="g", signame="inp")
         assert conn.portname == "g"
         assert conn.signame == "inp"
 
+    def test_make_connection_is_shared(self):
+        conn = make_connection("g", "inp")
+        assert conn == Connection(portname="g", signame="inp")
+        assert make_connection("g", "inp") is conn
+
     def test_instance(self):
         conns = [
             Connection(portname="g", signame="inp"),
@@ -98,92 +132,129 @@ class TestSvgToCircuit:
         assert len(circuit.signals) == 4
         assert len(circuit.instances) == 2
 
-    def test_inverter_ports(self, inverter_svg):
-        circuit = svg_to_circuit(inverter_svg)
-        signal_names = {s.name for s in circuit.signals}
-        assert "inp" in signal_names
-        assert "out" in signal_names
-        assert "VDD" in signal_names
-        assert "VSS" in signal_names
-
-    def test_inverter_instances(self, inverter_svg):
-        circuit = svg_to_circuit(inverter_svg)
-        instance_names = {i.name for i in circuit.instances}
-        assert "p1" in instance_names
-        assert "n1" in instance_names
-
-    def test_nand2_internal_signal(self, nand2_svg):
-        circuit = svg_to_circuit(nand2_svg)
-        assert circuit.name == "nand2"
-        internal_sigs = [s for s in circuit.signals if s.portdir == PortDir.INTERNAL]
+    def test_inverter_ports(self, inverter_circuit):
+        signals = inverter_circuit.signals_by_name
+        assert "inp" in signals
+        assert "out" in signals
+        assert "VDD" in signals
+        assert "VSS" in signals
+        assert signals["inp"].portdir == PortDir.INPUT
+
+    def test_inverter_instances(self, inverter_circuit):
+        instances = inverter_circuit.instances_by_name
+        assert "p1" in instances
+        assert "n1" in instances
+        assert inverter_circuit.instances_by_name is instances
+
+    def test_nand2_internal_signal(self, nand2_circuit):
+        assert nand2_circuit.name == "nand2"
+        internal_sigs = [
+            s for s in nand2_circuit.signals if s.portdir == PortDir.INTERNAL
+        ]
         assert len(internal_sigs) == 1
         assert internal_sigs[0].name == "mid"
 
-    def test_nand2_has_four_instances(self, nand2_svg):
-        circuit = svg_to_circuit(nand2_svg)
-        assert len(circuit.instances) == 4
+    def test_nand2_has_four_instances(self, nand2_circuit):
+        assert len(nand2_circuit.instances) == 4
 
-    def test_custom_prelude(self, custom_prelude_svg):
-        circuit = svg_to_circuit(custom_prelude_svg)
-        assert circuit.name == "resistor_divider"
-        assert "@h.paramclass" in circuit.prelude
-        assert "class Params:" in circuit.prelude
+    def test_nand2_shares_connections(self, nand2_circuit):
+        """Connections between the same (port, signal) pair are a single shared object."""
+        conns = {
+            (c.portname, c.signame): c for i in nand2_circuit.instances for c in i.conns
+        }
+        for instance in nand2_circuit.instances:
+            for conn in instance.conns:
+                assert conns[(conn.portname, conn.signame)] is conn
+
+    def test_custom_prelude(self, custom_prelude_circuit):
+        assert custom_prelude_circuit.name == "resistor_divider"
+        assert "@h.paramclass" in custom_prelude_circuit.prelude
+        assert "class Params:" in custom_prelude_circuit.prelude
 
     def test_file_not_found(self):
         with pytest.raises(FileNotFoundError):
             svg_to_circuit("nonexistent.sch.svg")
 
+    def test_directory(self, tmp_path):
+        with pytest.raises(IsADirectoryError, match="Schematic path is a directory"):
+            svg_to_circuit(tmp_path)
+
     def test_invalid_svg_no_defs(self, tmp_path):
         bad_svg = tmp_path / "bad.sch.svg"
         bad_svg.write_text('<?xml version="1.0"?><svg xmlns="http://www.w3.org/2000/svg"></svg>')
         with pytest.raises(RuntimeError, match="No hdl21-schematic-defs found"):
             svg_to_circuit(bad_svg)
 
+    def test_unnamed_circuit_uses_filename(self, tmp_path):
+        svg = tmp_path / "unnamed.sch.svg"
+        svg.write_text(
+            '<?xml version="1.0"?><svg xmlns="http://www.w3.org/2000/svg">'
+            '<defs id="hdl21-schematic-defs"><text id="hdl21-schematic-circuit">'
+            '{"name": "", "prelude": "", "signals": [], "instances": []}'
+            "</text></defs></svg>"
+        )
+        assert svg_to_circuit(svg).name == "unnamed"
+
+    def test_defs_after_other_elements(self, tmp_path):
+        svg = tmp_path / "late.sch.svg"
+        svg.write_text(
+            '<?xml version="1.0"?><svg xmlns="http://www.w3.org/2000/svg">'
+            '<g><defs id="hdl21-schematic-defs"><text id="hdl21-schematic-circuit">nested</text></defs></g>'
+            '<rect/><defs id="hdl21-schematic-defs"><text>prelude</text>'
+            '<text id="hdl21-schematic-circuit">'
+            '{"name": "late", "prelude": "", "signals": [], "instances": []}'
+            "</text></defs>"
+            "</svg>"
+        )
+        circuit = svg_to_circuit(svg)
+        assert circuit.name == "late"
+
+    def test_invalid_svg_no_circuit(self, tmp_path):
+        bad_svg = tmp_path / "bad.sch.svg"
+        bad_svg.write_text(
+            '<?xml version="1.0"?><svg xmlns="http://www.w3.org/2000/svg">'
+            '<path d="M 0 0"/><defs id="hdl21-schematic-defs"><style/></defs></svg>'
+        )
+        with pytest.raises(RuntimeError, match="No hdl21-schematic-circuit found"):
+            svg_to_circuit(bad_svg)
+
 
 class TestCircuitToCode:
     """Tests for Circuit to Python code conversion."""
 
-    def test_basic_code_generation(self, inverter_svg):
-        circuit = svg_to_circuit(inverter_svg)
-        code = circuit_to_code(circuit)
-        assert isinstance(code, str)
-        assert "@h.generator" in code
-        assert "def inverter(params: Params)" in code
+    def test_basic_code_generation(self, inverter_code):
+        assert isinstance(inverter_code, str)
+        assert "@h.generator" in inverter_code
+        assert "def inverter(params: Params)" in inverter_code
 
-    def test_code_has_ports(self, inverter_svg):
-        circuit = svg_to_circuit(inverter_svg)
-        code = circuit_to_code(circuit)
-        assert "m.inp = h.Input()" in code
-        assert "m.out = h.Output()" in code
-        assert "m.VDD = h.Inout()" in code
-        assert "m.VSS = h.Inout()" in code
+    def test_code_has_ports(self, inverter_code):
+        assert "m.inp = h.Input()" in inverter_code
+        assert "m.out = h.Output()" in inverter_code
+        assert "m.VDD = h.Inout()" in inverter_code
+        assert "m.VSS = h.Inout()" in inverter_code
 
-    def test_code_has_instances(self, inverter_svg):
-        circuit = svg_to_circuit(inverter_svg)
-        code = circuit_to_code(circuit)
-        assert "m.p1 = Pmos" in code
-        assert "m.n1 = Nmos" in code
+    def test_code_has_instances(self, inverter_code):
+        assert "m.p1 = Pmos" in inverter_code
+        assert "m.n1 = Nmos" in inverter_code
 
-    def test_internal_signals(self, nand2_svg):
-        circuit = svg_to_circuit(nand2_svg)
-        code = circuit_to_code(circuit)
-        assert "m.mid = h.Signal()" in code
+    def test_internal_signals(self, nand2_code):
+        assert "m.mid = h.Signal()" in nand2_code
 
-    def test_code_returns_module(self, inverter_svg):
-        circuit = svg_to_circuit(inverter_svg)
-        code = circuit_to_code(circuit)
-        assert "return m" in code
+    def test_code_returns_module(self, inverter_code):
+        assert "return m" in inverter_code
 
-    def test_default_prelude(self, inverter_svg):
-        circuit = svg_to_circuit(inverter_svg)
-        code = circuit_to_code(circuit)
-        assert "import hdl21 as h" in code
-        assert "from hdl21.primitives import *" in code
+    def test_default_prelude(self, inverter_code):
+        assert "import hdl21 as h" in inverter_code
+        assert "from hdl21.primitives import *" in inverter_code
 
 
 class TestImportSchematic:
     """Tests for the import_schematic function."""
 
+    # Tests which build and run hdl21 Generators share a worker under `pytest -n auto --dist loadgroup`,
+    # along with hdl21's global state
+    pytestmark = pytest.mark.xdist_group("hdl21")
+
     def test_returns_namespace(self, inverter_svg):
         ns = import_schematic(inverter_svg)
         assert isinstance(ns, SimpleNamespace)
@@ -215,10 +286,45 @@ class TestImportSchematic:
         assert h.isparamclass(ns.Params)
         assert ns.Params is not h.HasNoParams
 
+    def test_cached_until_changed(self, inverter_svg, tmp_path):
+        svg = tmp_path / "inverter.sch.svg"
+        svg.write_bytes(inverter_svg.read_bytes())
+        first = import_schematic(svg)
+        second = import_schematic(svg)
+        assert second is not first
+        assert second.inverter is first.inverter
+
+        # Touching the file without changing it keeps the cached import
+        stat = os.stat(svg)
+        os.utime(svg, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        assert import_schematic(svg).inverter is first.inverter
+
+        # Changing its content, even at the same size and modification time, imports it anew
+        stat = os.stat(svg)
+        svg.write_bytes(inverter_svg.read_bytes().replace(b"w=2*u", b"w=3*u"))
+        os.utime(svg, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert os.stat(svg).st_size == stat.st_size
+        third = import_schematic(svg)
+        assert third.inverter is not first.inverter
+
+        import_schematic.cache_clear()
+        assert import_schematic(svg).inverter is not third.inverter
+
+    def test_compiled_code_is_shared(self, inverter_svg, tmp_path):
+        first, second = tmp_path / "first.sch.svg", tmp_path / "second.sch.svg"
+        first.write_bytes(inverter_svg.read_bytes())
+        second.write_bytes(inverter_svg.read_bytes())
+        first_code = import_schematic(first).inverter.func.__code__
+        second_code = import_schematic(second).inverter.func.__code__
+        assert first_code.co_filename == "<schematic:inverter>"
+        assert second_code is first_code
+
 
 class TestPyImporter:
     """Test the Python import override mechanics."""
 
+    pytestmark = pytest.mark.xdist_group("hdl21")
+
     def test_import_schematic_module(self):
         """Test importing an SVG schematic as a Python module."""
         from . import schematic
@@ -243,21 +349,17 @@ class TestPyImporter:
 class TestEdgeCases:
     """Tests for edge cases and boundary conditions."""
 
-    def test_prelude_is_included_in_code(self, inverter_svg):
-        circuit = svg_to_circuit(inverter_svg)
-        code = circuit_to_code(circuit)
-        assert "import hdl21 as h" in code
-        assert "from hdl21.prefix import *" in code
+    def test_prelude_is_included_in_code(self, inverter_code):
+        assert "import hdl21 as h" in inverter_code
+        assert "from hdl21.prefix import *" in inverter_code
 
-    def test_circuit_name_from_filename(self, fixtures_dir):
+    def test_circuit_name_from_filename(self, inverter_circuit):
         """Circuit name should come from JSON, falling back to filename."""
-        circuit = svg_to_circuit(fixtures_dir / "inverter.sch.svg")
-        assert circuit.name == "inverter"
+        assert inverter_circuit.name == "inverter"
 
-    def test_connections_preserved(self, inverter_svg):
+    def test_connections_preserved(self, inverter_circuit):
         """Verify all connections are preserved through parsing."""
-        circuit = svg_to_circuit(inverter_svg)
-        p1 = next(i for i in circuit.instances if i.name == "p1")
+        p1 = inverter_circuit.instances_by_name["p1"]
         conn_ports = {c.portname for c in p1.conns}
         assert conn_ports == {"g", "d", "s", "b"}
 
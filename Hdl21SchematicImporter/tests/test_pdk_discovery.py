@@ -0,0 +1,634 @@
+"""
+Tests for the PDK discovery service.
+
+Exercises the JSON-RPC command handling, without requiring any PDK to be installed.
+"""
+
+import io
+import sys
+import json
+import threading
+from pathlib import Path
+
+import pytest
+from hdl21schematicimporter import pdk_discovery
+
+
+@pytest.fixture(autouse=True)
+def fresh_discovery(monkeypatch):
+    """Isolate each test from the module-level search paths and discovery cache."""
+    monkeypatch.setattr(pdk_discovery, "LOCAL_PDK_PATHS", [])
+    pdk_discovery.invalidate_discovery_cache()
+    yield
+    pdk_discovery.invalidate_discovery_cache()
+
+
+@pytest.fixture
+def fake_pdks(monkeypatch) -> list:
+    """Stand in a single discovered PDK, in place of whatever is installed."""
+    pdks = [
+        pdk_discovery.PdkInfo(
+            name="fake-pdk",
+            version="1.2.3",
+            devices=[
+                pdk_discovery.DeviceInfo(
+                    name="nfet_01v8",
+                    module_path="fake_pdk.nfet_01v8",
+                    category="transistors",
+                    ports=[pdk_discovery.PortInfo(name=p) for p in "dgsb"],
+                    params=[
+                        pdk_discovery.ParamInfo(name="w", dtype="float", default=1.0)
+                    ],
+                ),
+            ],
+        )
+    ]
+    monkeypatch.setattr(
+        pdk_discovery, "_iter_discover_pdks", lambda: iter(enumerate(pdks))
+    )
+    return pdks
+
+
+LOCAL_PDK_PRIMITIVES = """
+import hdl21 as h
+from hdl21.prefix import µ
+
+@h.paramclass
+class MosParams:
+    w = h.Param(dtype=h.Scalar, desc="Width", default=1 * µ)
+    nf = h.Param(dtype=int, desc="Fingers", default=1)
+
+nfet_01v8 = h.ExternalModule(
+    name="fake_fd_pr__nfet_01v8",
+    port_list=[h.Inout(name=n) for n in "dgsb"],
+    paramtype=MosParams,
+)
+res_poly = h.ExternalModule(
+    name="fake_fd_pr__res_poly",
+    port_list=[h.Inout(name=n) for n in "pn"],
+    paramtype=h.HasNoParams,
+)
+"""
+
+
+@pytest.fixture
+def local_pdk(tmp_path, monkeypatch) -> Path:
+    """Write a small on-disk PDK, in the layout expected by `add_local_path`."""
+    pdk_dir = tmp_path / "fakepdk"
+    module_dir = pdk_dir / "fakepdk_hdl21"
+    module_dir.mkdir(parents=True)
+    (pdk_dir / "pyproject.toml").write_text(
+        '[tool.poetry]\nname = "fakepdk-hdl21"\nversion = "0.4.2"\n'
+    )
+    (module_dir / "__init__.py").write_text('"""Fake PDK"""\n')
+    (module_dir / "primitives.py").write_text(LOCAL_PDK_PRIMITIVES)
+
+    # Discovery adds the PDK to `sys.path` and imports it; undo both afterwards.
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    yield pdk_dir
+    for name in [m for m in sys.modules if m.split(".")[0] == "fakepdk_hdl21"]:
+        del sys.modules[name]
+
+
+def run_main_raw(monkeypatch, capsysbinary, data: bytes) -> bytes:
+    """Feed `data` to `pdk_discovery.main` on stdin, and return its raw output."""
+    monkeypatch.setattr("sys.stdin", io.TextIOWrapper(io.BytesIO(data)))
+    pdk_discovery.main()
+    return capsysbinary.readouterr().out
+
+
+def run_main(monkeypatch, capsysbinary, *lines: str) -> list:
+    """Feed `lines` to `pdk_discovery.main` on stdin, and return the decoded responses."""
+    data = "".join(l + "\n" for l in lines).encode()
+    out = run_main_raw(monkeypatch, capsysbinary, data)
+    return [json.loads(l) for l in out.splitlines() if l.strip()]
+
+
+def frame(payload: str) -> bytes:
+    """Frame `payload` with a `Content-Length` header."""
+    data = payload.encode()
+    return b"Content-Length: %d\r\n\r\n" % len(data) + data
+
+
+class TestHandleCommand:
+    """Tests for single-command dispatch."""
+
+    def test_ping(self):
+        assert pdk_discovery.handle_command({"action": "ping"}) == {
+            "status": "ok",
+            "message": "pong",
+        }
+
+    def test_unknown_action(self):
+        result = pdk_discovery.handle_command({"action": "nope"})
+        assert result["status"] == "error"
+        assert "nope" in result["message"]
+
+
+class TestBatch:
+    """Tests for JSON-RPC style batch requests."""
+
+    def test_handle_batch(self):
+        results = pdk_discovery.handle_batch([{"action": "ping"}, {"action": "nope"}])
+        assert [r["status"] for r in results] == ["ok", "error"]
+
+    def test_batch_item_errors_are_isolated(self):
+        results = pdk_discovery.handle_batch(["not-a-command", {"action": "ping"}])
+        assert results[0]["status"] == "error"
+        assert results[1] == {"status": "ok", "message": "pong"}
+
+    def test_main_batch_and_scalar(self, monkeypatch, capsysbinary):
+        responses = run_main(
+            monkeypatch,
+            capsysbinary,
+            '{"action": "ping"}',
+            '[{"action": "ping"}, {"action": "ping"}]',
+        )
+        assert responses[0] == {"status": "ok", "message": "pong"}
+        assert responses[1] == [{"status": "ok", "message": "pong"}] * 2
+
+    def test_main_empty_batch(self, monkeypatch, capsysbinary):
+        (response,) = run_main(monkeypatch, capsysbinary, "[]")
+        assert response["status"] == "error"
+
+    def test_main_invalid_json(self, monkeypatch, capsysbinary):
+        (response,) = run_main(monkeypatch, capsysbinary, "{not json")
+        assert response["status"] == "error"
+        assert response["message"].startswith("Invalid JSON")
+
+
+class TestFraming:
+    """Tests for `Content-Length` framed messages."""
+
+    def responses(self, out: bytes) -> list:
+        """Split `out` into (decoded response, framed) pairs. Responses use the request format."""
+        stream, responses = io.BytesIO(out), []
+        while (message := pdk_discovery.read_message(stream)) is not None:
+            payload, framed = message
+            responses.append((json.loads(payload), framed))
+        return responses
+
+    def test_framed_request(self, monkeypatch, capsysbinary):
+        out = run_main_raw(monkeypatch, capsysbinary, frame('{"action": "ping"}'))
+        assert out.startswith(b"Content-Length: ")
+        assert self.responses(out) == [({"status": "ok", "message": "pong"}, True)]
+
+    def test_framed_payload_spanning_lines(self, monkeypatch, capsysbinary):
+        data = frame('[\n{"action": "ping"},\n{"action": "ping"}\n]')
+        out = run_main_raw(monkeypatch, capsysbinary, data)
+        assert self.responses(out) == [
+            ([{"status": "ok", "message": "pong"}] * 2, True)
+        ]
+
+    def test_mixed_framed_and_lines(self, monkeypatch, capsysbinary):
+        data = frame('{"action": "ping"}') + b'{"action": "ping"}\n' + frame("[]")
+        out = run_main_raw(monkeypatch, capsysbinary, data)
+        assert [(r["status"], framed) for r, framed in self.responses(out)] == [
+            ("ok", True),
+            ("ok", False),
+            ("error", True),
+        ]
+
+    def test_missing_content_length(self, monkeypatch, capsysbinary):
+        data = b"Content-Type: application/json\r\n\r\n"
+        out = run_main_raw(monkeypatch, capsysbinary, data)
+        assert self.responses(out) == [
+            ({"status": "error", "message": "Missing Content-Length header"}, True)
+        ]
+
+
+class TestDiscoveryCache:
+    """Tests for caching of discovery results."""
+
+    def test_discovery_is_cached(self):
+        assert pdk_discovery.discover_all_pdks() is pdk_discovery.discover_all_pdks()
+
+    def test_refresh_clears_cache(self):
+        pdks = pdk_discovery.discover_all_pdks()
+        result = pdk_discovery.handle_command({"action": "refresh"})
+        assert result["status"] == "ok"
+        assert pdk_discovery.discover_all_pdks() is not pdks
+
+    def test_add_local_path_clears_cache(self, tmp_path):
+        pdks = pdk_discovery.discover_all_pdks()
+        cmd = {"action": "add_local_path", "path": str(tmp_path)}
+        assert pdk_discovery.handle_command(cmd)["status"] == "ok"
+        assert pdk_discovery.discover_all_pdks() is not pdks
+
+    def test_failed_introspection_is_not_cached(self, monkeypatch):
+        pdk = pdk_discovery.PdkInfo(
+            name="flaky-pdk", version="1.0", description="", devices=[]
+        )
+        results = iter([None, pdk])
+        calls = []
+
+        def introspect(*args):
+            calls.append(args)
+            return next(results)
+
+        monkeypatch.setattr(pdk_discovery, "_introspect_pdk_uncached", introspect)
+        assert pdk_discovery._introspect_pdk("flaky-pdk", "flaky_pdk", "1.0") is None
+        assert pdk_discovery._introspect_pdk("flaky-pdk", "flaky_pdk", "1.0") is pdk
+        assert pdk_discovery._introspect_pdk("flaky-pdk", "flaky_pdk", "1.0") is pdk
+        assert len(calls) == 2
+
+    @staticmethod
+    def slow_discovery(monkeypatch, catalogs):
+        """Stand in a discovery which blocks until released, returning each of `catalogs` in turn."""
+        started, release = threading.Event(), threading.Event()
+        catalogs = iter(catalogs)
+
+        def discover():
+            pdks = next(catalogs)
+            started.set()
+            release.wait(5)
+            return pdks
+
+        monkeypatch.setattr(pdk_discovery, "_discover_all_pdks", discover)
+        return started, release
+
+    @staticmethod
+    def pdk(name: str):
+        return pdk_discovery.PdkInfo(
+            name=name, version="1.0", description="", devices=[]
+        )
+
+    def test_invalidation_during_discovery(self, monkeypatch):
+        """A discovery overlapping an invalidation (e.g. a background install completing) is not cached."""
+        old = [self.pdk("old-catalog-only")]
+        new = [self.pdk("old"), self.pdk("installed")]
+        started, release = self.slow_discovery(monkeypatch, [old, new])
+
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(pdk_discovery.discover_all_pdks())
+        )
+        thread.start()
+        assert started.wait(5)
+        pdk_discovery.invalidate_discovery_cache()
+        release.set()
+        thread.join(5)
+
+        assert results == [old]  # The in-flight discovery still returns its own results
+        assert pdk_discovery.discover_all_pdks() is new
+        assert pdk_discovery.discover_all_pdks() is new
+
+    def test_invalidation_during_dict_discovery(self, monkeypatch):
+        old, new = [self.pdk("old-catalog-only")], [self.pdk("installed")]
+        started, release = self.slow_discovery(monkeypatch, [old, new])
+
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(pdk_discovery.discover_all_pdk_dicts())
+        )
+        thread.start()
+        assert started.wait(5)
+        pdk_discovery.invalidate_discovery_cache()
+        release.set()
+        thread.join(5)
+
+        assert [p["name"] for p in results[0]] == ["old-catalog-only"]
+        assert [p["name"] for p in pdk_discovery.discover_all_pdk_dicts()] == [
+            "installed"
+        ]
+
+
+class TestClassification:
+    """Tests for device-name to symbol/category classification."""
+
+    @pytest.mark.parametrize(
+        "name, num_ports, symbol",
+        [
+            ("nfet_03v3", 4, "Nmos"),
+            ("PFET_05v0", 4, "Pmos"),
+            ("npn_10p00x10p00", 3, "Npn"),
+            ("cap_mim_2f0fF", 2, "Cap"),
+            ("rm1", 2, "Res"),
+            ("ppolyf_u", 3, "Res3"),
+            ("diode_nd2ps", 2, "Diode"),
+            # Earlier patterns take priority, wherever they appear
+            ("cap_nmos", 2, "Nmos"),
+            ("something_else", 2, "Nmos"),
+        ],
+    )
+    def test_symbol_type(self, name, num_ports, symbol):
+        assert pdk_discovery.get_symbol_type(name, num_ports) == symbol
+
+    @pytest.mark.parametrize(
+        "name, category",
+        [
+            ("nfet_03v3", "transistors"),
+            ("pnp_05p00x05p00", "transistors"),
+            ("diode_pd2nw", "diodes"),
+            ("mim_cap", "passives"),
+            ("vsource", "sources"),
+            ("something_else", "other"),
+        ],
+    )
+    def test_category(self, name, category):
+        assert pdk_discovery.get_category(name) == category
+
+
+class TestDeviceDetails:
+    """Tests for the `get_device_details` command."""
+
+    def test_found(self, fake_pdks):
+        cmd = {"action": "get_device_details", "pdk": "fake-pdk", "device": "nfet_01v8"}
+        result = pdk_discovery.handle_command(cmd)
+        assert result["status"] == "ok"
+        assert result["device"]["module_path"] == "fake_pdk.nfet_01v8"
+        assert [p["name"] for p in result["device"]["ports"]] == ["d", "g", "s", "b"]
+
+    def test_not_found(self, fake_pdks):
+        cmd = {"action": "get_device_details", "pdk": "fake-pdk", "device": "nope"}
+        result = pdk_discovery.handle_command(cmd)
+        assert result["status"] == "error"
+        assert "nope" in result["message"]
+
+
+class TestDiscover:
+    """Tests for the `discover` command."""
+
+    def test_discover(self, fake_pdks):
+        result = pdk_discovery.handle_command({"action": "discover"})
+        assert result["status"] == "ok"
+        (pdk,) = result["pdks"]
+        assert pdk["name"] == "fake-pdk"
+        assert pdk["devices"][0]["params"][0] == {
+            "name": "w",
+            "dtype": "float",
+            "default": 1.0,
+            "description": "",
+        }
+
+    def test_serialized_pdks_are_cached(self, fake_pdks):
+        first = pdk_discovery.handle_command({"action": "discover"})["pdks"]
+        assert pdk_discovery.handle_command({"action": "discover"})["pdks"] is first
+        pdk_discovery.handle_command({"action": "refresh"})
+        assert pdk_discovery.handle_command({"action": "discover"})["pdks"] is not first
+
+
+class TestDiscoverStream:
+    """Tests for the `discover_stream` command."""
+
+    def test_stream(self, fake_pdks, monkeypatch, capsysbinary):
+        responses = run_main(monkeypatch, capsysbinary, '{"action": "discover_stream"}')
+        assert [r["status"] for r in responses] == ["partial", "ok"]
+        assert responses[0]["pdk"]["name"] == "fake-pdk"
+        assert responses[1]["done"] is True
+
+    def test_stream_fills_cache(self, fake_pdks):
+        list(pdk_discovery.handle_command({"action": "discover_stream"}))
+        assert pdk_discovery.discover_all_pdks() == fake_pdks
+        streamed = list(pdk_discovery.iter_discover_pdks())
+        assert streamed == fake_pdks
+
+    def test_stream_in_batch(self, fake_pdks):
+        (responses,) = pdk_discovery.handle_batch([{"action": "discover_stream"}])
+        assert [r["status"] for r in responses] == ["partial", "ok"]
+
+
+class TestLocalPdk:
+    """Tests for discovery of PDKs from local paths."""
+
+    def test_discover_local_pdk(self, local_pdk):
+        pdk = pdk_discovery.discover_local_pdk(str(local_pdk))
+        assert pdk.name == "fakepdk"
+        assert pdk.version == "0.4.2"
+        assert pdk.description == "Fake PDK"
+
+        devices = {d.name: d for d in pdk.devices}
+        assert set(devices) == {"nfet_01v8", "res_poly"}
+
+        nfet = devices["nfet_01v8"]
+        assert nfet.module_path == "fakepdk_hdl21.primitives.nfet_01v8"
+        assert nfet.category == "transistors"
+        assert nfet.symbol_type == "Nmos"
+        assert [p.name for p in nfet.ports] == ["d", "g", "s", "b"]
+        assert [(p.name, p.default, p.description) for p in nfet.params] == [
+            ("w", "1*MICRO", "Width"),
+            ("nf", 1, "Fingers"),
+        ]
+
+        res = devices["res_poly"]
+        assert res.category == "passives"
+        assert res.symbol_type == "Res"
+        assert res.params == []
+
+    def test_discover_via_commands(self, local_pdk, monkeypatch):
+        monkeypatch.setattr(pdk_discovery, "KNOWN_PDKS", {})
+        cmd = {"action": "add_local_path", "path": str(local_pdk)}
+        assert pdk_discovery.handle_command(cmd)["status"] == "ok"
+
+        result = pdk_discovery.handle_command({"action": "discover"})
+        assert [p["name"] for p in result["pdks"]] == ["fakepdk"]
+
+        cmd = {"action": "get_device_details", "pdk": "fakepdk", "device": "res_poly"}
+        result = pdk_discovery.handle_command(cmd)
+        assert result["device"]["module_path"] == "fakepdk_hdl21.primitives.res_poly"
+
+    def test_missing_local_path(self, tmp_path):
+        assert pdk_discovery.discover_local_pdk(str(tmp_path / "nope")) is None
+
+
+class TestIsDevice:
+    """Tests for `is_hdl21_device`."""
+
+    def test_external_module(self):
+        import hdl21 as h
+
+        dev = h.ExternalModule(name="dev", port_list=[h.Inout(name="p")])
+        assert pdk_discovery.is_hdl21_device(dev)
+
+    def test_external_module_without_ports(self):
+        import hdl21 as h
+
+        assert not pdk_discovery.is_hdl21_device(
+            h.ExternalModule(name="dev", port_list=[])
+        )
+
+    @pytest.mark.parametrize(
+        "obj", [sys, len, lambda: 0, "nmos", 1, None, [], {}, Path]
+    )
+    def test_non_devices(self, obj):
+        assert not pdk_discovery.is_hdl21_device(obj)
+
+    def test_duck_typed_after_non_device_of_same_type(self):
+        from types import SimpleNamespace
+
+        cfg = SimpleNamespace(x=1)
+        duck = SimpleNamespace(
+            port_list=["p"], paramtype=None, domain=None, name="duck"
+        )
+        assert not pdk_discovery.is_hdl21_device(cfg)
+        assert pdk_discovery.is_hdl21_device(duck)
+        assert not pdk_discovery.is_hdl21_device(cfg)
+
+
+class TestIntrospectModule:
+    """Tests for `introspect_module`."""
+
+    def test_devices_in_name_order(self):
+        import types
+        import hdl21 as h
+
+        module = types.ModuleType("fake_module")
+        for name in ["zz_res", "aa_nfet", "mm_cap"]:
+            setattr(
+                module, name, h.ExternalModule(name=name, port_list=[h.Inout(name="p")])
+            )
+        devices = pdk_discovery.introspect_module(module, "fake_module")
+        assert [d.name for d in devices] == ["aa_nfet", "mm_cap", "zz_res"]
+
+
+class TestDefaultPorts:
+    """Tests for name-based default ports, for devices which do not declare any."""
+
+    @pytest.mark.parametrize(
+        "name, ports",
+        [
+            ("my_nfet", ["d", "g", "s", "b"]),
+            ("poly_res", ["p", "n"]),
+            ("diode_x", ["p", "n"]),
+            ("npn_x", ["c", "b", "e"]),
+            ("pnp_fet", ["d", "g", "s", "b"]),  # Earlier patterns take priority
+            ("mystery", []),
+        ],
+    )
+    def test_default_ports(self, name, ports):
+        class Device:
+            pass
+
+        Device.__name__ = name
+        result = pdk_discovery.extract_ports_from_device(Device)
+        assert [p.name for p in result] == ports
+
+
+class TestExtractParams:
+    """Tests for parameter extraction, and its per-paramclass caching."""
+
+    def test_shared_paramtype(self):
+        import hdl21 as h
+
+        @h.paramclass
+        class Params:
+            w = h.Param(dtype=float, desc="Width", default=1.0)
+
+        a = h.ExternalModule(name="a", port_list=[], paramtype=Params)
+        b = h.ExternalModule(name="b", port_list=[], paramtype=Params)
+        params_a = pdk_discovery.extract_params_from_device(a)
+        params_b = pdk_discovery.extract_params_from_device(b)
+        assert [(p.name, p.dtype, p.default, p.description) for p in params_a] == [
+            ("w", "float", 1.0, "Width")
+        ]
+        assert params_a == params_b
+        assert params_a is not params_b
+        assert params_a[0] is params_b[0]
+
+    def test_params_class(self):
+        class Device:
+            class Params:
+                l: float = 0.15
+
+        result = pdk_discovery.extract_params_from_device(Device)
+        assert [(p.name, p.dtype, p.default) for p in result] == [("l", "float", 0.15)]
+        assert pdk_discovery.extract_params_from_device(Device) == result
+
+
+class TestPyprojectVersion:
+    """Tests for reading local PDK versions from `pyproject.toml`."""
+
+    @pytest.mark.parametrize(
+        "content",
+        [
+            '[project]\nname = "x"\nversion = "1.2.3"\n',
+            '[tool.poetry]\nname = "x"\nversion = "1.2.3"\n',
+            '[project]\nname = "x"\nversion = "1.2.3"\n\n[tool.x]\nversion = "0.0.0"\n',
+        ],
+    )
+    def test_version(self, tmp_path, content):
+        path = tmp_path / "pyproject.toml"
+        path.write_text(content)
+        assert pdk_discovery.get_pyproject_version(str(path)) == "1.2.3"
+
+    def test_no_version(self, tmp_path):
+        path = tmp_path / "pyproject.toml"
+        path.write_text('[project]\nname = "x"\n')
+        assert pdk_discovery.get_pyproject_version(str(path)) is None
+
+    def test_missing_file(self, tmp_path):
+        assert (
+            pdk_discovery.get_pyproject_version(str(tmp_path / "pyproject.toml"))
+            is None
+        )
+
+    def test_cache_follows_modification(self, tmp_path):
+        import os
+
+        path = tmp_path / "pyproject.toml"
+        path.write_text('[project]\nversion = "1.0"\n')
+        assert pdk_discovery.get_pyproject_version(str(path)) == "1.0"
+        path.write_text('[project]\nversion = "2.0"\n')
+        os.utime(path, ns=(0, 10**9))  # Ensure a distinct modification time
+        assert pdk_discovery.get_pyproject_version(str(path)) == "2.0"
+
+
+@pytest.mark.skipif(
+    sys.platform == "win32", reason="Uses a shell script as a stand-in for Python"
+)
+class TestInstall:
+    """Tests for the `install` command, with a stand-in for `python -m pip`."""
+
+    @pytest.fixture
+    def fake_pip(self, tmp_path, monkeypatch):
+        script = tmp_path / "fake-python"
+        script.write_text(
+            '#!/bin/sh\necho "Collecting $4"\necho "Installed $4"\nexit 0\n'
+        )
+        script.chmod(0o755)
+        monkeypatch.setattr(sys, "executable", str(script))
+
+    def test_install(self, fake_pip):
+        result = pdk_discovery.handle_command(
+            {"action": "install", "package": "fakepdk"}
+        )
+        assert result == {
+            "status": "ok",
+            "output": "Collecting fakepdk\nInstalled fakepdk\n",
+            "returncode": 0,
+        }
+
+    def test_install_progress(self, fake_pip):
+        lines = []
+        result = pdk_discovery.install_pdk("fakepdk", lines.append)
+        assert result["status"] == "ok"
+        assert lines == ["Collecting fakepdk", "Installed fakepdk"]
+
+    def test_install_in_background(self, fake_pip, monkeypatch, capsysbinary):
+        cmd = '{"action": "install", "package": "fakepdk", "background": true, "id": 7}'
+        responses = run_main(monkeypatch, capsysbinary, cmd)
+        for thread in threading.enumerate():
+            if thread.name == "install-fakepdk":
+                thread.join()
+        responses += [json.loads(l) for l in capsysbinary.readouterr().out.splitlines()]
+        # The install may complete before or after `main` has answered the command itself
+        assert {"status": "started", "id": 7} in responses
+        responses.remove({"status": "started", "id": 7})
+        assert responses[:2] == [
+            {"status": "progress", "id": 7, "line": "Collecting fakepdk"},
+            {"status": "progress", "id": 7, "line": "Installed fakepdk"},
+        ]
+        assert responses[2]["status"] == "ok"
+        assert responses[2]["id"] == 7
+
+    def test_install_failure(self, tmp_path, monkeypatch):
+        script = tmp_path / "fake-python"
+        script.write_text('#!/bin/sh\necho "No matching distribution" >&2\nexit 1\n')
+        script.chmod(0o755)
+        monkeypatch.setattr(sys, "executable", str(script))
+        result = pdk_discovery.install_pdk("nope")
+        assert result == {
+            "status": "error",
+            "output": "No matching distribution\n",
+            "returncode": 1,
+        }